@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import date
+from typing import Any
+
+from models.flights import ExternalFlight
+
+from .provider import AIProvider
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Skips a provider that keeps failing. After `failure_threshold` consecutive failures (errors, slow calls or
+    deadline misses) the breaker opens and the provider is left out for `cooldown` seconds. Then one trial call goes
+    through: a success closes the breaker, a failure opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._trial or time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self._trial or time.monotonic() - self.opened_at < self.cooldown:
+            return False
+        self._trial = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial = False
+
+    def record_cancelled(self):
+        # A call dropped because another provider answered first says nothing about this provider
+        self._trial = False
+
+
+class ProviderStats:
+    """Call counters and recent latencies of one provider in this worker"""
+
+    def __init__(self, window: int = 500):
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.slow = 0
+        self.cancelled = 0
+        self.skipped = 0
+        # Seconds taken by the last `window` calls. Calls cut short at the deadline or past the slow threshold are
+        # recorded at the time they were dropped, a lower bound, so the percentiles keep the slow tail
+        self.latencies: deque[float] = deque(maxlen=window)
+
+    def percentile(self, pct: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "slow": self.slow,
+            "cancelled": self.cancelled,
+            "skipped": self.skipped,
+            **{
+                f"p{pct}_ms": round(value * 1000, 1) if (value := self.percentile(pct)) is not None else None
+                for pct in (50, 95, 99)
+            },
+        }
+
+
+class ProviderSlot:
+    """
+    A provider of a CompositeProvider, with its circuit breaker and stats. Calls taking longer than `slow_after`
+    seconds count as failures for the breaker whether they answered or were dropped, so a provider that keeps
+    hanging stops being tried first and making every search wait for the hedge.
+    """
+
+    def __init__(self, name: str, provider: AIProvider, breaker: CircuitBreaker, slow_after: float):
+        self.name = name
+        self.provider = provider
+        self.breaker = breaker
+        self.slow_after = slow_after
+        self.stats = ProviderStats()
+
+    async def search(self, origin_iata: str, destination_iata: str, date: date) -> list[ExternalFlight] | None:
+        """Returns the provider's flights, or None if it failed"""
+        self.stats.calls += 1
+        started = time.perf_counter()
+        try:
+            flights = await self.provider.asearch_external_flights(origin_iata, destination_iata, date)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("AI provider %s failed", self.name, exc_info=True)
+            self.stats.failures += 1
+            self.breaker.record_failure()
+            return None
+        elapsed = time.perf_counter() - started
+        self.stats.latencies.append(elapsed)
+        if elapsed > self.slow_after:
+            self.stats.slow += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return flights
+
+    def abandon(self, elapsed: float, timed_out: bool):
+        """Records a call cancelled after `elapsed` seconds, at the deadline or because another provider answered"""
+        if timed_out or elapsed > self.slow_after:
+            if timed_out:
+                self.stats.timeouts += 1
+            else:
+                self.stats.slow += 1
+            self.stats.latencies.append(elapsed)
+            self.breaker.record_failure()
+        else:
+            self.stats.cancelled += 1
+            self.breaker.record_cancelled()
+
+
+class CompositeProvider(AIProvider):
+    """
+    Searches several providers within one deadline. Providers are tried in their configured order, the next one
+    starting when the previous has not answered within `hedge_delay` seconds, or at once if it failed or found
+    nothing. With `merge`, every provider starts at once and their flights are combined until the deadline;
+    otherwise the first non-empty answer wins and the other calls are cancelled. Providers that miss the
+    deadline are cancelled too. Calls that miss the deadline or take longer than `slow_after` seconds count as
+    failures for their provider's circuit breaker.
+    """
+
+    def __init__(
+        self,
+        providers: list[tuple[str, AIProvider]],
+        deadline: float,
+        hedge_delay: float,
+        merge: bool,
+        failure_threshold: int,
+        cooldown: float,
+        slow_after: float,
+    ):
+        self.slots = [
+            ProviderSlot(name, provider, CircuitBreaker(failure_threshold, cooldown), slow_after)
+            for name, provider in providers
+        ]
+        self.deadline = deadline
+        self.hedge_delay = hedge_delay
+        self.merge = merge
+
+    def search_external_flights(self, origin_iata: str, destination_iata: str, date: date) -> list[ExternalFlight]:
+        # For callers outside the event loop only
+        return asyncio.run(self.asearch_external_flights(origin_iata, destination_iata, date))
+
+    async def asearch_external_flights(
+        self, origin_iata: str, destination_iata: str, date: date
+    ) -> list[ExternalFlight]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        # Slots not tried yet, in priority order. Breakers are asked only when a slot is about to start, since
+        # allow() claims the trial call of a half-open breaker
+        waiting = list(self.slots)
+        # Running calls, with their slot and start time
+        running: dict[asyncio.Task, tuple[ProviderSlot, float]] = {}
+        merged: dict[tuple[str, str], ExternalFlight] = {}
+
+        def start_next() -> bool:
+            while waiting:
+                slot = waiting.pop(0)
+                if not slot.breaker.allow():
+                    slot.stats.skipped += 1
+                    continue
+                task = asyncio.create_task(slot.search(origin_iata, destination_iata, date))
+                running[task] = (slot, time.perf_counter())
+                return True
+            return False
+
+        while start_next() and (self.merge or self.hedge_delay <= 0):
+            pass
+        try:
+            while running:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                timeout = min(remaining, self.hedge_delay) if waiting else remaining
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done and waiting:
+                    # The running providers are slow; hedge with the next one
+                    start_next()
+                # Calls finishing together are taken in priority order, and all leave `running` first, as they
+                # have recorded their outcome and must not be abandoned below
+                finished = sorted(done, key=lambda task: self.slots.index(running[task][0]))
+                for task in finished:
+                    running.pop(task)
+                for task in finished:
+                    flights = task.result()
+                    if flights and not self.merge:
+                        return flights
+                    for flight in flights or []:
+                        merged.setdefault((flight.flight_number, flight.departure_time.isoformat()), flight)
+                    if not flights and waiting:
+                        start_next()
+            return list(merged.values())
+        finally:
+            timed_out = loop.time() >= deadline
+            for task, (slot, started) in running.items():
+                task.cancel()
+                slot.abandon(time.perf_counter() - started, timed_out)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "deadline_seconds": self.deadline,
+            "providers": {
+                slot.name: {"breaker": slot.breaker.state, **slot.stats.as_dict()} for slot in self.slots
+            },
+        }
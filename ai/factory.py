@@ -1,17 +1,61 @@
+import threading
+
 from app.config import Settings, get_settings
 
+from .composite import CompositeProvider
 from .provider import AIProvider, MockProvider
 
+_provider: AIProvider | None = None
+# The settings object the provider was built from; get_settings returns a new one after reset_settings_cache
+_provider_settings: Settings | None = None
+_provider_lock = threading.Lock()
 
-def get_ai_provider() -> AIProvider:
-    settings = get_settings()
-    provider_name = settings.AI_PROVIDER.value if settings.AI_PROVIDER else "MOCK"
+
+def build_single_provider(provider_name: str, raise_errors: bool = False) -> AIProvider:
     if provider_name == Settings.AIProviderEnum.OPENAI.value:
         # Lazy import to avoid requiring openai when not used
         from .provider import OpenAIProvider
-        return OpenAIProvider()
+        return OpenAIProvider(raise_errors)
     if provider_name == Settings.AIProviderEnum.HUGGINGFACE.value:
         # Lazy import to avoid requiring langchain-huggingface when not used
         from .provider import HuggingFaceProvider
-        return HuggingFaceProvider()
+        return HuggingFaceProvider(raise_errors)
     return MockProvider()
+
+
+def build_ai_provider(settings: Settings) -> AIProvider:
+    names = [Settings.AIProviderEnum(name.strip().upper()) for name in settings.AI_PROVIDERS.split(",") if name.strip()]
+    if names:
+        return CompositeProvider(
+            [(name.value, build_single_provider(name.value, raise_errors=True)) for name in names],
+            deadline=settings.AI_SEARCH_DEADLINE,
+            hedge_delay=settings.AI_HEDGE_DELAY,
+            merge=settings.AI_MERGE_RESULTS,
+            failure_threshold=settings.AI_BREAKER_FAILURES,
+            cooldown=settings.AI_BREAKER_COOLDOWN,
+            slow_after=settings.AI_SLOW_CALL_SECONDS,
+        )
+    return build_single_provider(settings.AI_PROVIDER.value if settings.AI_PROVIDER else "MOCK")
+
+
+def get_ai_provider() -> AIProvider:
+    """
+    Returns the provider shared by all searches of this worker, so its LLM clients and their HTTP connections
+    are reused. It is built on first use (the app builds it at startup) and rebuilt when the settings change.
+    """
+    global _provider, _provider_settings
+    settings = get_settings()
+    if _provider is None or _provider_settings is not settings:
+        with _provider_lock:
+            if _provider is None or _provider_settings is not settings:
+                _provider = build_ai_provider(settings)
+                _provider_settings = settings
+    return _provider
+
+
+def reset_ai_provider():
+    """Drops the shared provider; the next search builds a new one"""
+    global _provider, _provider_settings
+    with _provider_lock:
+        _provider = None
+        _provider_settings = None
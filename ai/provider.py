@@ -1,9 +1,12 @@
 
+import asyncio
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal
-from typing import Protocol
+from functools import partial
+from typing import Any, Protocol
 
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
@@ -13,6 +16,17 @@ from app.config import get_settings
 from models.flights import ExternalFlight, ExternalFlightsResponse
 
 
+# Blocking provider calls run here, so that at most this many LLM calls hold threads of a worker at once
+blocking_pool = ThreadPoolExecutor(max_workers=get_settings().AI_THREAD_POOL_SIZE, thread_name_prefix="ai-provider")
+
+
+async def run_blocking_search(provider: Any, origin_iata: str, destination_iata: str, date: date) -> list:
+    """Runs a provider's synchronous search on the bounded AI thread pool instead of the event loop"""
+    loop = asyncio.get_running_loop()
+    search = partial(provider.search_external_flights, origin_iata, destination_iata, date)
+    return await loop.run_in_executor(blocking_pool, search)
+
+
 class AIProvider(Protocol):
     def search_external_flights(self, origin_iata: str, destination_iata: str, date: date) -> list:
         """Return a list of external flights suggested by the AI/provider.
@@ -20,20 +34,25 @@ class AIProvider(Protocol):
         """
         ...
 
+    async def asearch_external_flights(self, origin_iata: str, destination_iata: str, date: date) -> list:
+        """Async variant of `search_external_flights`. Providers without an async client inherit this default,
+        which runs the blocking search on the AI thread pool.
+        """
+        return await run_blocking_search(self, origin_iata, destination_iata, date)
+
 
 class OpenAIProvider(AIProvider):
-    def __init__(self):
+    def __init__(self, raise_errors: bool = False):
         settings = get_settings()
+        # Composite providers need to tell a failed call from one that found no flights
+        self.raise_errors = raise_errors
         self.api_key = settings.OPENAI_API_KEY
         self.model = settings.OPENAI_MODEL or "gpt-4.1-mini"
         self._llm = ChatOpenAI(model=self.model, api_key=self.api_key, temperature=0.2) if self.api_key else None # type: ignore
+        # Built once, as the provider is shared by all searches
+        self._structured_llm = self._llm.with_structured_output(ExternalFlightsResponse) if self._llm else None
 
-    def search_external_flights(self, origin_iata: str, destination_iata: str, date: date) -> list[ExternalFlight]:
-        if not self._llm:
-            return []
-
-        structured_llm = self._llm.with_structured_output(ExternalFlightsResponse)
-
+    def _messages(self, origin_iata: str, destination_iata: str, date: date):
         sys = SystemMessage(
             content=(
                 "You are a travel assistant. Return external flight options not in our system. "
@@ -50,10 +69,30 @@ class OpenAIProvider(AIProvider):
                 "return null if unknown."
             )
         )
+        return [sys, usr]
+
+    def search_external_flights(self, origin_iata: str, destination_iata: str, date: date) -> list[ExternalFlight]:
+        if not self._structured_llm:
+            return []
         try:
-            result = structured_llm.invoke([sys, usr])
+            result = self._structured_llm.invoke(self._messages(origin_iata, destination_iata, date))
             return result.flights # type: ignore
         except Exception:
+            if self.raise_errors:
+                raise
+            return []
+
+    async def asearch_external_flights(
+        self, origin_iata: str, destination_iata: str, date: date
+    ) -> list[ExternalFlight]:
+        if not self._structured_llm:
+            return []
+        try:
+            result = await self._structured_llm.ainvoke(self._messages(origin_iata, destination_iata, date))
+            return result.flights # type: ignore
+        except Exception:
+            if self.raise_errors:
+                raise
             return []
 
 
@@ -83,10 +122,17 @@ class MockProvider(AIProvider):
             ),
         ]
 
+    async def asearch_external_flights(
+        self, origin_iata: str, destination_iata: str, date: date
+    ) -> list[ExternalFlight]:
+        return self.search_external_flights(origin_iata, destination_iata, date)
+
 
 class HuggingFaceProvider(AIProvider):
-    def __init__(self):
+    def __init__(self, raise_errors: bool = False):
         settings = get_settings()
+        # Composite providers need to tell a failed call from one that found no flights
+        self.raise_errors = raise_errors
         self.api_key = settings.HUGGINGFACE_API_KEY
         self.model = settings.HUGGINGFACE_MODEL or "HuggingFaceH4/zephyr-7b-beta"
         # Initialize only if dependencies and token are available
@@ -105,11 +151,7 @@ class HuggingFaceProvider(AIProvider):
         else:
             self._llm = None  # type: ignore
 
-    def search_external_flights(self, origin_iata: str, destination_iata: str, date: date) -> list[ExternalFlight]:
-        # HuggingFace chat models do not reliably support Pydantic/TypedDict structured outputs; parse JSON.
-        if not getattr(self, "_llm", None):
-            return []
-
+    def _messages(self, origin_iata: str, destination_iata: str, date: date):
         sys = SystemMessage(
             content=(
                 "You are a travel assistant. Return external flight options not in our system. "
@@ -126,71 +168,95 @@ class HuggingFaceProvider(AIProvider):
                 "Output JSON only, no commentary or markdown fences. Keep fields concise."
             )
         )
+        return [sys, usr]
+
+    def _parse_flights(self, msg: Any, origin_iata: str, destination_iata: str) -> list[ExternalFlight]:
+        content = getattr(msg, "content", msg)
+        # Normalize content to a plain string
+        if isinstance(content, list):
+            parts: list[str] = []
+            for part in content:
+                if isinstance(part, str):
+                    parts.append(part)
+                elif isinstance(part, dict):
+                    text = part.get("text") or part.get("content") or ""
+                    if isinstance(text, str):
+                        parts.append(text)
+            content = "".join(parts)
+        if not isinstance(content, str):
+            return []
+
+        # Extract potential JSON (supports fenced blocks)
+        json_str = content.strip()
+        fence = re.search(r"```(?:json)?\n(.*?)```", json_str, flags=re.DOTALL)
+        if fence:
+            json_str = fence.group(1).strip()
+        else:
+            # Exclude every character outside the opening and closign curly braces
+            start = json_str.find("{")
+            end = json_str.rfind("}")
+            if start != -1 and end != -1 and end > start:
+                json_str = json_str[start : end + 1]
+
+        # First, try strict JSON
         try:
-            msg = self._llm.invoke([sys, usr])  # type: ignore
-            content = getattr(msg, "content", msg)
-            # Normalize content to a plain string
-            if isinstance(content, list):
-                parts: list[str] = []
-                for part in content:
-                    if isinstance(part, str):
-                        parts.append(part)
-                    elif isinstance(part, dict):
-                        text = part.get("text") or part.get("content") or ""
-                        if isinstance(text, str):
-                            parts.append(text)
-                content = "".join(parts)
-            if not isinstance(content, str):
-                return []
+            data = json.loads(json_str)
+        except Exception:
 
-            # Extract potential JSON (supports fenced blocks)
-            json_str = content.strip()
-            fence = re.search(r"```(?:json)?\n(.*?)```", json_str, flags=re.DOTALL)
-            if fence:
-                json_str = fence.group(1).strip()
-            else:
-                # Exclude every character outside the opening and closign curly braces
-                start = json_str.find("{")
-                end = json_str.rfind("}")
-                if start != -1 and end != -1 and end > start:
-                    json_str = json_str[start : end + 1]
-
-            # First, try strict JSON
+            def _sq_to_dq(m: re.Match[str]) -> str:
+                s = m.group(0)
+                inner = s[1:-1]
+                return '"' + inner.replace('"', '\\"') + '"'
+
+            # Repair common non-JSON artifacts (single quotes, None/True/False, trailing commas)
+            repaired = json_str
+            repaired = re.sub(r"\bNone\b", "null", repaired)
+            repaired = re.sub(r"\bTrue\b", "true", repaired)
+            repaired = re.sub(r"\bFalse\b", "false", repaired)
+            repaired = re.sub(r",\s*([}\]])", r"\1", repaired)  # Remove that occurs just before a closing bracket
+            # Replace single quoytes with double quotes
+            repaired = re.sub(r"'([^'\\]*(?:\\.[^'\\]*)*)'", _sq_to_dq, repaired)
             try:
-                data = json.loads(json_str)
+                data = json.loads(repaired)
             except Exception:
+                return []
+
+        flights: list[ExternalFlight] = []
+        if isinstance(data, dict) and isinstance(data.get("flights"), list):
+            for item in data["flights"]:
+                if isinstance(item, dict):
+                    item.setdefault("departure_iata", origin_iata)
+                    item.setdefault("destination_iata", destination_iata)
+                    item.setdefault("arrival_time", None)
+                    item.setdefault("airfare", None)
+                    item.setdefault("booking_url", None)
+                    try:
+                        flights.append(ExternalFlight(**item))
+                    except Exception:
+                        continue
+        return flights
 
-                def _sq_to_dq(m: re.Match[str]) -> str:
-                    s = m.group(0)
-                    inner = s[1:-1]
-                    return '"' + inner.replace('"', '\\"') + '"'
-
-                # Repair common non-JSON artifacts (single quotes, None/True/False, trailing commas)
-                repaired = json_str
-                repaired = re.sub(r"\bNone\b", "null", repaired)
-                repaired = re.sub(r"\bTrue\b", "true", repaired)
-                repaired = re.sub(r"\bFalse\b", "false", repaired)
-                repaired = re.sub(r",\s*([}\]])", r"\1", repaired)  # Remove that occurs just before a closing bracket
-                # Replace single quoytes with double quotes
-                repaired = re.sub(r"'([^'\\]*(?:\\.[^'\\]*)*)'", _sq_to_dq, repaired)
-                try:
-                    data = json.loads(repaired)
-                except Exception:
-                    return []
-
-            flights: list[ExternalFlight] = []
-            if isinstance(data, dict) and isinstance(data.get("flights"), list):
-                for item in data["flights"]:
-                    if isinstance(item, dict):
-                        item.setdefault("departure_iata", origin_iata)
-                        item.setdefault("destination_iata", destination_iata)
-                        item.setdefault("arrival_time", None)
-                        item.setdefault("airfare", None)
-                        item.setdefault("booking_url", None)
-                        try:
-                            flights.append(ExternalFlight(**item))
-                        except Exception:
-                            continue
-            return flights
+    def search_external_flights(self, origin_iata: str, destination_iata: str, date: date) -> list[ExternalFlight]:
+        # HuggingFace chat models do not reliably support Pydantic/TypedDict structured outputs; parse JSON.
+        if not getattr(self, "_llm", None):
+            return []
+        try:
+            msg = self._llm.invoke(self._messages(origin_iata, destination_iata, date))  # type: ignore
+            return self._parse_flights(msg, origin_iata, destination_iata)
+        except Exception:
+            if self.raise_errors:
+                raise
+            return []
+
+    async def asearch_external_flights(
+        self, origin_iata: str, destination_iata: str, date: date
+    ) -> list[ExternalFlight]:
+        if not getattr(self, "_llm", None):
+            return []
+        try:
+            msg = await self._llm.ainvoke(self._messages(origin_iata, destination_iata, date))  # type: ignore
+            return self._parse_flights(msg, origin_iata, destination_iata)
         except Exception:
+            if self.raise_errors:
+                raise
             return []
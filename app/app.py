@@ -1,18 +1,25 @@
+import logging
 import os
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import APIRouter, FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
+from ai.factory import get_ai_provider, reset_ai_provider
+from app.websocket_manager import manager
 from app_graphql.router import graphql_router
 from authentication.router import router as auth_router
 from common.router import router as common_router
+from flights.cache import warm_reference_cache
 from flights.router import router as flight_router
 
 from . import middlewares
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 api_v1_router = APIRouter(prefix="/api/v1")
 
@@ -21,7 +28,26 @@ api_v1_router.include_router(common_router, tags=['common'])
 api_v1_router.include_router(flight_router, tags=["flights"])
 
 
-app = FastAPI(title="FlightsHub API", version="0.1.0", description="FlightsHub API Project")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await run_in_threadpool(warm_reference_cache)
+    except Exception:
+        # Not fatal: the cache loads itself on first use
+        logger.exception("Could not warm the reference data cache")
+    try:
+        # Builds the shared AI provider now, so the first search does not pay for its setup
+        await run_in_threadpool(get_ai_provider)
+    except Exception:
+        # Not fatal: searches retry building it
+        logger.exception("Could not build the AI provider")
+    await manager.start()
+    yield
+    await manager.stop()
+    reset_ai_provider()
+
+
+app = FastAPI(title="FlightsHub API", version="0.1.0", description="FlightsHub API Project", lifespan=lifespan)
 
 # Ensure uploads directory exists before mounting
 os.makedirs("uploads", exist_ok=True)
@@ -33,9 +59,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Process-Time"]
+    expose_headers=["X-Process-Time", "X-DB-Query-Count", "X-DB-Time"]
 )
 app.middleware("http")(middlewares.add_process_time_header)
+app.middleware("http")(middlewares.add_query_stats_headers)
+app.middleware("http")(middlewares.pin_primary_after_write)
 
 app.include_router(api_v1_router)
 app.include_router(graphql_router, prefix="/graphql")
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+from collections import defaultdict
+from typing import Any, Awaitable, Callable
+
+from pydantic_core import to_json
+from redis.asyncio import Redis
+
+from app.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+# Called on every worker with (group, key, frame, seq) for each published event; the frame is the rendered message
+EventHandler = Callable[[str, Any, str, int], Awaitable[None]]
+
+
+class InProcessBroadcast:
+    """Delivers events to this worker only. Used by tests and single-worker deployments"""
+
+    def __init__(self):
+        self._handler: EventHandler | None = None
+        self._sequences: dict[str, int] = defaultdict(int)
+
+    async def start(self, handler: EventHandler):
+        self._handler = handler
+
+    async def stop(self):
+        self._handler = None
+
+    async def next_sequence(self, name: str) -> int:
+        self._sequences[name] += 1
+        return self._sequences[name]
+
+    async def current_sequence(self, name: str) -> int:
+        return self._sequences.get(name, 0)
+
+    async def publish(self, group: str, key: Any, frame: str, seq: int = 0):
+        if self._handler is not None:
+            await self._handler(group, key, frame, seq)
+
+
+class RedisBroadcast:
+    """
+    Relays events through a Redis pub/sub channel, so an event published by any worker reaches the sockets of
+    every worker, including its own. Sequence numbers come from Redis counters shared by all workers.
+    """
+
+    def __init__(self, redis: Redis, channel: str = "flightshub:ws"):
+        self.redis = redis
+        self.channel = channel
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, handler: EventHandler):
+        self._listener = asyncio.create_task(self._listen(handler))
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        await self.redis.aclose()
+
+    async def next_sequence(self, name: str) -> int:
+        return await self.redis.incr(f"{self.channel}:seq:{name}")
+
+    async def current_sequence(self, name: str) -> int:
+        return int(await self.redis.get(f"{self.channel}:seq:{name}") or 0)
+
+    async def publish(self, group: str, key: Any, frame: str, seq: int = 0):
+        # A JSON header line, then the frame as is, so receivers forward it without decoding it
+        header = to_json({"group": group, "key": key, "seq": seq})
+        await self.redis.publish(self.channel, header + b"\n" + frame.encode())
+
+    async def _listen(self, handler: EventHandler):
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for item in pubsub.listen():
+                        if item["type"] != "message":
+                            continue
+                        header, _, frame = item["data"].partition(b"\n")
+                        event = json.loads(header)
+                        try:
+                            await handler(event["group"], event["key"], frame.decode(), event["seq"])
+                        except Exception:
+                            logger.exception("Could not deliver a broadcast event")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Events published while disconnected are lost; clients catch up through the seat sequence numbers
+                logger.exception("Broadcast subscription lost, reconnecting")
+                await asyncio.sleep(1)
+
+
+def build_broadcast_backend():
+    settings = get_settings()
+    # Tests run without Redis
+    is_pytest = "PYTEST_CURRENT_TEST" in os.environ or "pytest" in sys.modules
+    if is_pytest or settings.WS_BROADCAST_BACKEND == Settings.BroadcastBackendEnum.MEMORY:
+        return InProcessBroadcast()
+    return RedisBroadcast(Redis.from_url(settings.REDIS_URL))
@@ -9,6 +9,10 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # Optional streaming replica; safe reads are routed to it when set
+    DATABASE_REPLICA_URL: str | None = None
+    # After a write, the client's reads stay on the primary for this many seconds
+    DB_REPLICA_PIN_SECONDS: int = 5
     TEST_DATABASE_URL: str
     DB_USER: str
     DB_PASSWORD: str
@@ -24,6 +28,12 @@ class Settings(BaseSettings):
     EMAIL_SENDER: str
     EMAIL_PASSWORD: str
     FE_PW_RESET_URL: str
+    # Database connection pool, per engine and per worker process
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
     # AI / GenAI settings
     class AIProviderEnum(StrEnum):
         OPENAI = "OPENAI"
@@ -36,7 +46,50 @@ class Settings(BaseSettings):
     # HuggingFace (free tier supported)
     HUGGINGFACE_API_KEY: str | None = None
     HUGGINGFACE_MODEL: str | None = None
+    # Comma-separated providers (e.g. "OPENAI,HUGGINGFACE") searched together in this order; overrides AI_PROVIDER
+    AI_PROVIDERS: str = ""
+    # Seconds an external search may take; providers still running then are cancelled
+    AI_SEARCH_DEADLINE: float = 20
+    # With several providers: seconds before the next provider is also tried, or merge the answers of all of them
+    AI_HEDGE_DELAY: float = 3
+    AI_MERGE_RESULTS: bool = False
+    # A provider failing, slow or missing the deadline this many times in a row is skipped for the cooldown (seconds)
+    AI_BREAKER_FAILURES: int = 3
+    AI_BREAKER_COOLDOWN: float = 60
+    # Provider calls taking longer than this many seconds count as failures for the breaker
+    AI_SLOW_CALL_SECONDS: float = 3
+    # Threads for AI providers that only offer blocking calls
+    AI_THREAD_POOL_SIZE: int = 4
+    # External (AI) search results are reused for this many seconds; the in-process cache keeps this many searches
+    AI_SEARCH_CACHE_TTL: int = 900
+    AI_SEARCH_CACHE_SIZE: int = 1000
+    # Seconds one worker may hold a search's provider call before another worker may retry it
+    AI_SEARCH_LOCK_TTL: int = 30
     ALGORITHM: str = "HS256"
+    DEBUG: bool = False
+    # In debug and test runs, warn when one statement shape runs more than this many times in a request
+    SQL_REPEAT_WARN_THRESHOLD: int = 10
+    # Seconds before the in-process airport/airline cache is reloaded, bounding staleness across workers
+    REFERENCE_CACHE_TTL: int = 300
+    # Seconds a worker serves a flight's seat availability from memory before reloading it
+    SEAT_INVENTORY_TTL: int = 30
+    # Seconds a checkout hold keeps its seats from other passengers
+    SEAT_HOLD_TTL: int = 600
+    # WebSocket subscribers: messages queued per client, seconds a send may take, and the idle ping cadence.
+    # A client that sends nothing (e.g. no "pong") for WS_PING_INTERVAL + WS_PONG_TIMEOUT seconds is dropped
+    WS_QUEUE_SIZE: int = 100
+    WS_SEND_TIMEOUT: float = 5
+    WS_PING_INTERVAL: float = 25
+    WS_PONG_TIMEOUT: float = 20
+    # Seat changes of a flight within this many seconds are merged into one message
+    WS_COALESCE_WINDOW: float = 0.1
+
+    # Relays WebSocket events between workers; MEMORY only reaches the sockets of the publishing worker
+    class BroadcastBackendEnum(StrEnum):
+        REDIS = "REDIS"
+        MEMORY = "MEMORY"
+
+    WS_BROADCAST_BACKEND: BroadcastBackendEnum = BroadcastBackendEnum.REDIS
     app_name: str = "FlightsHub"
     model_config = SettingsConfigDict(env_file=str(Path(__file__).parent / "local.env"))
 
@@ -48,6 +101,7 @@ def get_settings():
     try:
         if "PYTEST_CURRENT_TEST" in os.environ or "pytest" in sys.modules:
             settings.AI_PROVIDER = Settings.AIProviderEnum.MOCK
+            settings.AI_PROVIDERS = ""
     except Exception:
         # If detection fails, keep existing value
         pass
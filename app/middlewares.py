@@ -1,7 +1,14 @@
+import logging
+import sys
 import time
 
 from fastapi import Request
 
+from app.config import get_settings
+from db import PRIMARY_PIN_COOKIE, SAFE_METHODS, QueryStats, engine, query_stats, replica_engine
+
+logger = logging.getLogger(__name__)
+
 
 async def add_process_time_header(request: Request, call_next):
     """Some a sample code"""
@@ -10,3 +17,37 @@ async def add_process_time_header(request: Request, call_next):
     process_time = time.perf_counter() - start_time
     response.headers["X-Process-Time"] = f"{process_time:.6f}"
     return response
+
+
+async def add_query_stats_headers(request: Request, call_next):
+    """Reports the number of SQL queries and the time spent in the database while serving the request"""
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        query_stats.reset(token)
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Time"] = f"{stats.duration:.6f}"
+
+    settings = get_settings()
+    if settings.DEBUG or "pytest" in sys.modules:
+        for statement, count in stats.repeated(settings.SQL_REPEAT_WARN_THRESHOLD):
+            logger.warning(
+                "Possible N+1: %s %s ran the same statement %d times: %s",
+                request.method,
+                request.url.path,
+                count,
+                " ".join(statement.split()),
+            )
+    return response
+
+
+async def pin_primary_after_write(request: Request, call_next):
+    """Keeps the client's reads on the primary for a short while after it writes, so it reads its own writes"""
+    response = await call_next(request)
+    wrote = request.method not in SAFE_METHODS and response.status_code < 400
+    if replica_engine is not engine and wrote:
+        window = get_settings().DB_REPLICA_PIN_SECONDS
+        response.set_cookie(PRIMARY_PIN_COOKIE, f"{time.time() + window:.3f}", max_age=window, httponly=True)
+    return response
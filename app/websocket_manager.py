@@ -1,49 +1,265 @@
-from collections import defaultdict
-from typing import Any
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Hashable
 
 from fastapi import WebSocket
+from pydantic_core import to_json
 
-from models.flights import SeatRead
+from app.broadcast import InProcessBroadcast, RedisBroadcast, build_broadcast_backend
+from app.config import get_settings
+from flights.seat_inventory import seat_inventory
+from models.flights import SeatRead, SeatStatus
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+def render(message: dict[str, Any]) -> str:
+    """Encodes a message once for all its recipients; pydantic-core's encoder also takes models as they are"""
+    return to_json(message).decode()
+
+
+PING_FRAME = render({"type": "ping"})
+
+# Subscribers of each flight id or search key
+SubscriberGroup = dict[Hashable, dict[WebSocket, "Subscriber"]]
+
+
+class Subscriber:
+    """
+    One client socket. Messages are queued and sent by the subscriber's own writer task, so a broadcast never
+    waits on a socket and a slow client only delays itself. The writer also pings idle clients and closes the
+    socket when the client lags (full queue, send timeout) or stops answering.
+    """
+
+    def __init__(self, websocket: WebSocket, group: SubscriberGroup, key: Hashable):
+        self.websocket = websocket
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=settings.WS_QUEUE_SIZE)
+        self.last_seen = time.monotonic()
+        self.closed = False
+        self._group = group
+        self._key = key
+        self._writer = asyncio.create_task(self._write())
+
+    def seen(self):
+        """Call on every client message; a client silent for longer than the pong timeout is reaped"""
+        self.last_seen = time.monotonic()
+
+    def send(self, frame: str):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.evict("outbound queue full")
+
+    async def _write(self):
+        reason = "connection lost"
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(self.queue.get(), settings.WS_PING_INTERVAL)
+                except TimeoutError:
+                    if time.monotonic() - self.last_seen > settings.WS_PING_INTERVAL + settings.WS_PONG_TIMEOUT:
+                        reason = "ping timeout"
+                        break
+                    frame = PING_FRAME
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(frame), settings.WS_SEND_TIMEOUT)
+                except TimeoutError:
+                    # A cancelled send may have left a partial frame, so the socket cannot be reused
+                    reason = "send timeout"
+                    break
+        except asyncio.CancelledError:
+            return
+        except Exception:
+            pass
+        self.evict(reason)
+
+    def evict(self, reason: str):
+        if self.closed:
+            return
+        self.closed = True
+        subscribers = self._group.get(self._key)
+        if subscribers is not None:
+            subscribers.pop(self.websocket, None)
+            if not subscribers:
+                del self._group[self._key]
+        if reason != "disconnected":
+            logger.info("Evicting websocket subscriber of %s: %s", self._key, reason)
+            self._closing = asyncio.create_task(self._close())
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    async def _close(self):
+        try:
+            await asyncio.wait_for(self.websocket.close(), settings.WS_SEND_TIMEOUT)
+        except Exception:
+            pass
 
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict[int, list[WebSocket]] = defaultdict(list)
+    """
+    Subscribers connected to this worker. Broadcasts are published once to the broadcast backend, which hands
+    them back to the manager of every worker to deliver to its own sockets.
+    """
+
+    SEATS = "seats"
+    SEARCH = "search"
+
+    def __init__(self, backend: InProcessBroadcast | RedisBroadcast):
+        self.backend = backend
+        self.active_connections: SubscriberGroup = {}
+        # Sequence number of the last seat_changed message of each flight
+        self.seat_sequences: dict[int, int] = defaultdict(int)
+        # Seat changes waiting for the end of their flight's coalescing window, and the tasks that send them
+        self._pending_changes: dict[int, dict[str, SeatStatus]] = {}
+        self._flush_tasks: dict[int, asyncio.Task] = {}
+        # flight_id -> (seq, rendered at, seats_snapshot frame)
+        self._snapshots: OrderedDict[int, tuple[int, float, str]] = OrderedDict()
+        self.max_snapshots = 1000
         # External search connections keyed by "{ORIGIN}-{DESTINATION}-{YYYY-MM-DD}"
-        self.search_connections: dict[str, list[WebSocket]] = defaultdict(list)
+        self.search_connections: SubscriberGroup = {}
+
+    async def start(self):
+        await self.backend.start(self._deliver)
+
+    async def stop(self):
+        for task in list(self._flush_tasks.values()):
+            task.cancel()
+        await self.backend.stop()
+
+    async def _deliver(self, group: str, key: Any, frame: str, seq: int):
+        if group == self.SEATS:
+            self.seat_sequences[key] = max(self.seat_sequences[key], seq)
+            self._snapshots.pop(key, None)
+            # Keeps this worker's seat inventory current with bookings made on other workers
+            for change in json.loads(frame)["data"]:
+                seat_inventory.set_status(key, [change["seat_number"]], SeatStatus(change["status"]))
+            self._fan_out(self.active_connections, key, frame)
+        elif group == self.SEARCH:
+            self._fan_out(self.search_connections, key, frame)
 
-    async def connect(self, websocket: WebSocket, flight_id: int):
+    @staticmethod
+    async def _subscribe(group: SubscriberGroup, key: Hashable, websocket: WebSocket, first_frame: str | None = None):
         await websocket.accept()
-        self.active_connections[flight_id].append(websocket)
+        subscriber = Subscriber(websocket, group, key)
+        # Queued before the subscriber is registered, so no broadcast can overtake it
+        if first_frame is not None:
+            subscriber.send(first_frame)
+        group.setdefault(key, {})[websocket] = subscriber
+        return subscriber
+
+    @staticmethod
+    def _unsubscribe(group: SubscriberGroup, key: Hashable, websocket: WebSocket):
+        subscriber = group.get(key, {}).get(websocket)
+        if subscriber is not None:
+            subscriber.evict("disconnected")
+
+    @staticmethod
+    def _fan_out(group: SubscriberGroup, key: Hashable, frame: str):
+        # Every subscriber gets the same frame. Copied, since a subscriber whose queue is full removes itself
+        for subscriber in list(group.get(key, {}).values()):
+            subscriber.send(frame)
+
+    async def connect(self, websocket: WebSocket, flight_id: int, snapshot: str | None = None) -> Subscriber:
+        """Subscribes to the flight's seat changes, starting with the given `seats_snapshot` frame"""
+        return await self._subscribe(self.active_connections, flight_id, websocket, snapshot)
 
     def disconnect(self, flight_id: int, websocket: WebSocket):
-        if flight_id in self.active_connections:
-            self.active_connections[flight_id].remove(websocket)
+        self._unsubscribe(self.active_connections, flight_id, websocket)
+
+    async def seats_snapshot(
+        self, flight_id: int, load_seats: Callable[[], Awaitable[list[SeatRead] | None]]
+    ) -> str | None:
+        """
+        Returns the `seats_snapshot` frame of the flight: every seat, with the sequence number of the last change
+        it includes. Changes are absolute statuses, so a change replayed on top of a snapshot that already has it
+        is harmless. The frame is shared by all subscribers until the flight's next change is delivered.
+        """
+        if flight_id not in self.seat_sequences:
+            await self._seed_sequence(flight_id)
+        seq = self.seat_sequences[flight_id]
+        cached = self._snapshots.get(flight_id)
+        if cached is not None and cached[0] == seq and time.monotonic() - cached[1] < settings.SEAT_INVENTORY_TTL:
+            self._snapshots.move_to_end(flight_id)
+            return cached[2]
+        seats = await load_seats()
+        if seats is None:
+            return None
+        frame = render({"type": "seats_snapshot", "flight_id": flight_id, "seq": seq, "data": seats})
+        # A change delivered while the seats loaded makes this frame stale, but the client still gets that change
+        if self.seat_sequences[flight_id] == seq:
+            self._snapshots[flight_id] = (seq, time.monotonic(), frame)
+            self._snapshots.move_to_end(flight_id)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return frame
 
-    async def broadcast_seats(self, flight_id: int, seats: list[SeatRead]):
-        if flight_id in self.active_connections:
-            for connection in self.active_connections[flight_id]:
+    async def _seed_sequence(self, flight_id: int):
+        # A worker new to the flight starts from the shared counter, so its first snapshot does not look like a gap
+        try:
+            current = await self.backend.current_sequence(f"{self.SEATS}:{flight_id}")
+        except Exception:
+            logger.warning("Could not read the seat sequence of flight %s", flight_id, exc_info=True)
+            return
+        self.seat_sequences[flight_id] = max(self.seat_sequences[flight_id], current)
+
+    def send_seats_snapshot(self, websocket: WebSocket, flight_id: int, snapshot: str):
+        subscriber = self.active_connections.get(flight_id, {}).get(websocket)
+        if subscriber is not None:
+            # Queued like the broadcasts, so the snapshot keeps its place among the changes
+            subscriber.send(snapshot)
+
+    async def broadcast_seat_changes(self, flight_id: int, changes: dict[str, SeatStatus]):
+        """
+        Sends the new status of the seats that changed. Changes to a flight within WS_COALESCE_WINDOW seconds
+        go out as one message with the latest status of each seat, so the message rate per flight is bounded
+        however fast bookings arrive. Sequence numbers increase by one per message, so a client that sees a gap
+        has missed a change and should ask for a snapshot by sending "resync".
+        """
+        if not changes:
+            return
+        self._pending_changes.setdefault(flight_id, {}).update(changes)
+        if flight_id not in self._flush_tasks:
+            self._flush_tasks[flight_id] = asyncio.create_task(self._flush_seat_changes(flight_id))
+
+    async def _flush_seat_changes(self, flight_id: int):
+        # One task per flight sends its messages in turn, so they are published in sequence order
+        try:
+            while flight_id in self._pending_changes:
+                await asyncio.sleep(settings.WS_COALESCE_WINDOW)
+                changes = self._pending_changes.pop(flight_id)
                 try:
-                    await connection.send_json({"type": "seats_update", "data": [seat.model_dump() for seat in seats]})
+                    seq = await self.backend.next_sequence(f"{self.SEATS}:{flight_id}")
+                    frame = render(
+                        {
+                            "type": "seat_changed",
+                            "flight_id": flight_id,
+                            "seq": seq,
+                            "data": [{"seat_number": seat, "status": status} for seat, status in changes.items()],
+                        }
+                    )
+                    await self.backend.publish(self.SEATS, flight_id, frame, seq)
                 except Exception:
-                    pass
+                    logger.exception("Could not broadcast the seat changes of flight %s", flight_id)
+        finally:
+            self._flush_tasks.pop(flight_id, None)
 
-    async def connect_search(self, websocket: WebSocket, search_key: str):
-        await websocket.accept()
-        self.search_connections[search_key].append(websocket)
+    async def connect_search(self, websocket: WebSocket, search_key: str, results: str | None = None) -> Subscriber:
+        """Subscribes to the search's external results, starting with the given `external_search` frame"""
+        return await self._subscribe(self.search_connections, search_key, websocket, results)
 
     def disconnect_search(self, search_key: str, websocket: WebSocket):
-        if search_key in self.search_connections:
-            self.search_connections[search_key].remove(websocket)
+        self._unsubscribe(self.search_connections, search_key, websocket)
 
     async def broadcast_search_results(self, search_key: str, results: list[dict[str, Any]]):
-        if search_key in self.search_connections:
-            for connection in self.search_connections[search_key]:
-                try:
-                    await connection.send_json({"type": "external_search", "data": results})
-                except Exception:
-                    pass
+        await self.backend.publish(self.SEARCH, search_key, self.search_results_frame(results))
+
+    @staticmethod
+    def search_results_frame(results: list[dict[str, Any]]) -> str:
+        return render({"type": "external_search", "data": results})
 
 
 # Single instance for the entire application
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager(build_broadcast_backend())
@@ -2,6 +2,7 @@ import strawberry
 from fastapi import HTTPException
 
 from app_graphql.permissions import IsAdminUser
+from flights.cache import reference_cache
 from models.common import AirlineAdminLink
 from models.flights import Airline, Airport
 
@@ -36,6 +37,7 @@ class AirportsMutation:
         except Exception as exc_:
             session.rollback()
             raise HTTPException(detail=str(exc_), status_code=400)
+        reference_cache.invalidate()
         return AirportType(
             id=port_.id,  # type: ignore
             airport_name=port_.airport_name,
@@ -68,6 +70,7 @@ class AirportsMutation:
         except Exception as exc_:
             session.rollback()
             raise HTTPException(detail=str(exc_), status_code=400)
+        reference_cache.invalidate()
         return AirportType(
             id=stored_port.id,  # type: ignore
             airport_name=stored_port.airport_name,
@@ -103,6 +106,7 @@ class AirlinesMutation:
         except Exception as exc_:
             session.rollback()
             raise HTTPException(detail=str(exc_), status_code=400)
+        reference_cache.invalidate()
         return AirlineType(
             id=airline.id,  # type: ignore
             airline_name=airline.airline_name,
@@ -136,6 +140,7 @@ class AirlinesMutation:
         except Exception as exc_:
             session.rollback()
             raise HTTPException(detail=str(exc_), status_code=400)
+        reference_cache.invalidate()
         return AirlineType(
             id=stored_airline.id,  # type: ignore
             airline_name=stored_airline.airline_name,
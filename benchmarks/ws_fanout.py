@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of the CPU cost of one seat-map broadcast to many subscribers.
+
+Compares encoding the message for every socket, as ConnectionManager.broadcast_seats used to do, with rendering
+the frame once and handing the same string to every socket. Sockets are stubs, so only encoding is measured.
+
+    python -m benchmarks.ws_fanout --seats 300 --subscribers 500
+"""
+
+import argparse
+import json
+import time
+
+from app.websocket_manager import render
+from flights.seat_maps import expand_seat_range
+from models.flights import SeatRead, SeatStatus, SmallFlight
+
+
+class StubWebSocket:
+    def __init__(self):
+        self.sent = 0
+
+    def send_text(self, frame: str):
+        self.sent += len(frame)
+
+
+def encode_per_socket(seats: list[SeatRead], sockets: list[StubWebSocket]):
+    for socket in sockets:
+        # Starlette's send_json encodes with json.dumps for every socket
+        message = {"type": "seats_update", "data": [seat.model_dump() for seat in seats]}
+        socket.send_text(json.dumps(message, separators=(",", ":"), ensure_ascii=False))
+
+
+def encode_once(seats: list[SeatRead], sockets: list[StubWebSocket]):
+    frame = render({"type": "seats_snapshot", "data": seats})
+    for socket in sockets:
+        socket.send_text(frame)
+
+
+def run(func, seats, sockets, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(seats, sockets)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seats", type=int, default=300)
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    flight = SmallFlight(id=1, flight_number="FH100")
+    rows = -(-args.seats // 6)
+    seats = [
+        SeatRead(id=i, seat_number=seat, status=SeatStatus.AVAILABLE, flight=flight)
+        for i, seat in enumerate(expand_seat_range(f"1A-{rows}F")[: args.seats])
+    ]
+    sockets = [StubWebSocket() for _ in range(args.subscribers)]
+
+    per_socket = run(encode_per_socket, seats, sockets, args.rounds)
+    once = run(encode_once, seats, sockets, args.rounds)
+    print(f"{args.seats} seats x {args.subscribers} subscribers, mean of {args.rounds} broadcasts")
+    print(f"  encode per socket: {per_socket * 1000:9.2f} ms")
+    print(f"  encode once:       {once * 1000:9.2f} ms  ({per_socket / once:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
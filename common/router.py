@@ -1,5 +1,13 @@
+from typing import Annotated
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+
+from ai.composite import CompositeProvider
+from ai.factory import get_ai_provider
+from authentication.utils import get_current_active_user
+from db import async_engine, async_replica_engine, engine, pool_status, replica_engine
+from flights.search_cache import search_cache
+from models.authentication import User
 
 router = APIRouter(
     prefix="/common",
@@ -12,4 +20,50 @@ router = APIRouter(
     response_description="Testing path in the Common module",
 )
 def common():
-    return "Hello from here again updated"
\ No newline at end of file
+    return "Hello from here again updated"
+
+
+@router.get(
+    "/internal/db-pool/",
+    summary="Database connection pool stats",
+    response_description="Occupancy and checkout counters of this worker's connection pools",
+)
+def db_pool_stats(current_user: Annotated[User, Depends(get_current_active_user)]):
+    """Pool stats are per worker process, so size pools as `workers x (pool_size + max_overflow)` against `max_connections`"""
+    if current_user.role != "Global Admin":
+        raise HTTPException(status_code=403, detail="Permission denied")
+    stats = {
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine),
+    }
+    if replica_engine is not engine:
+        stats["replica_sync"] = pool_status(replica_engine)
+        stats["replica_async"] = pool_status(async_replica_engine)
+    return stats
+
+
+@router.get(
+    "/internal/search-cache/",
+    summary="External search cache stats",
+    response_description="Hit and miss counters of this worker's external (AI) search cache",
+)
+def search_cache_stats(current_user: Annotated[User, Depends(get_current_active_user)]):
+    """Counters are per worker process. A low hit ratio on repeated routes suggests raising `AI_SEARCH_CACHE_TTL`"""
+    if current_user.role != "Global Admin":
+        raise HTTPException(status_code=403, detail="Permission denied")
+    return {"ttl_seconds": search_cache.ttl, **search_cache.stats.as_dict()}
+
+
+@router.get(
+    "/internal/ai-providers/",
+    summary="External search provider stats",
+    response_description="Latency percentiles, failure counts and circuit breaker state of each AI provider",
+)
+def ai_provider_stats(current_user: Annotated[User, Depends(get_current_active_user)]):
+    """Stats are per worker process, and only kept when several providers are configured in `AI_PROVIDERS`"""
+    if current_user.role != "Global Admin":
+        raise HTTPException(status_code=403, detail="Permission denied")
+    provider = get_ai_provider()
+    if not isinstance(provider, CompositeProvider):
+        return {}
+    return provider.stats()
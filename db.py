@@ -1,21 +1,229 @@
-
 import os
-from typing import Annotated
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Annotated, Any
 
 from dotenv import load_dotenv
-from fastapi import Depends
+from fastapi import Depends, Request
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 load_dotenv("app/local.env")
 
 is_pytest = bool(os.environ.get("PYTEST_CURRENT_TEST"))
 DB_URL = os.getenv("TEST_DATABASE_URL") if is_pytest else os.getenv("DATABASE_URL")
-engine = create_engine(DB_URL, pool_pre_ping=True)  # type: ignore
+# Tests always run against the single test database
+REPLICA_URL = None if is_pytest else os.getenv("DATABASE_REPLICA_URL") or None
+
+# Mirrors the DB_POOL_* fields of app.config.Settings. They are read from the environment here,
+# like DB_URL, because app.config cannot be imported before the routers that import this module.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+class PoolStats:
+    """Cumulative checkout counters for a connection pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+
+    def as_dict(self) -> dict[str, Any]:
+        attempts = self.checkouts + self.timeouts
+        return {
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.timeouts,
+            "total_wait_seconds": round(self.wait_time, 6),
+            "avg_wait_seconds": round(self.wait_time / attempts, 6) if attempts else 0.0,
+            "max_wait_seconds": round(self.max_wait_time, 6),
+        }
+
+
+class _PoolStatsMixin:
+    """Times every checkout, including the ones that end in a `QueuePool limit` timeout"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            conn = super().connect()  # type: ignore
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        # Keep the counters when the pool is rebuilt after a dispose or an invalidation
+        pool = super().recreate()  # type: ignore
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_PoolStatsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_PoolStatsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+POOL_OPTIONS: dict[str, Any] = {
+    "pool_size": POOL_SIZE,
+    "max_overflow": MAX_OVERFLOW,
+    "pool_timeout": POOL_TIMEOUT,
+    "pool_recycle": POOL_RECYCLE,
+    "pool_pre_ping": POOL_PRE_PING,
+}
+
+engine = create_engine(DB_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)  # type: ignore
+
+
+def to_async_url(url: str) -> str:
+    """Returns the given postgres URL with the asyncpg driver"""
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+ASYNC_DB_URL = to_async_url(DB_URL)  # type: ignore
+async_engine = create_async_engine(ASYNC_DB_URL, poolclass=InstrumentedAsyncQueuePool, **POOL_OPTIONS)
+
+# Without a replica, reads share the primary engines
+if REPLICA_URL:
+    replica_engine = create_engine(REPLICA_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+    async_replica_engine = create_async_engine(
+        to_async_url(REPLICA_URL), poolclass=InstrumentedAsyncQueuePool, **POOL_OPTIONS
+    )
+else:
+    replica_engine = engine
+    async_replica_engine = async_engine
+
+class QueryStats:
+    """SQL statements issued while serving a single request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # Statements are parameterized, so the SQL text is the statement shape
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement shapes issued more than `threshold` times, the usual sign of an N+1 lazy load"""
+        return [(stmt, n) for stmt, n in self.statements.most_common() if n > threshold]
+
+
+# Set per request by app.middlewares.add_query_stats_headers; queries outside a request are not recorded
+query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if query_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = query_stats.get()
+    start_times = conn.info.get("query_start_time")
+    if stats is not None and start_times:
+        stats.record(statement, time.perf_counter() - start_times.pop())
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Set by app.middlewares.pin_primary_after_write; holds the unix time until which reads stay on the primary
+PRIMARY_PIN_COOKIE = "db_primary_until"
+
+
+def is_pinned_to_primary(request: Request) -> bool:
+    """Whether the client wrote recently enough that the replica may not have caught up yet"""
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def reads_from_replica(request: Request, read_only: bool = False) -> bool:
+    """Safe requests (or read-only endpoints) go to the replica, unless the client is pinned to the primary"""
+    if replica_engine is engine:
+        return False
+    if not (read_only or request.method in SAFE_METHODS):
+        return False
+    return not is_pinned_to_primary(request)
+
+
+def pool_status(engine_: Engine | AsyncEngine) -> dict[str, Any]:
+    """Returns the live occupancy and the checkout counters of an engine's pool"""
+    pool = engine_.pool
+    status: dict[str, Any] = {
+        "pool_size": pool.size(),  # type: ignore
+        "checked_in": pool.checkedin(),  # type: ignore
+        "checked_out": pool.checkedout(),  # type: ignore
+        "overflow": max(pool.overflow(), 0),  # type: ignore
+        "max_overflow": pool._max_overflow,  # type: ignore
+        "timeout": pool.timeout(),  # type: ignore
+    }
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.as_dict())
+    return status
+
+
+def get_session(request: Request):
+    bind = replica_engine if reads_from_replica(request) else engine
+    with Session(bind) as session:
+        yield session
+
+
+async def get_async_session(request: Request):
+    bind = async_replica_engine if reads_from_replica(request) else async_engine
+    # Attributes are kept loaded after commit, since lazy loading is not available on the event loop
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_async_read_session(request: Request):
+    """For endpoints that only read but are not called with a safe method, e.g. POST /flights/search"""
+    bind = async_replica_engine if reads_from_replica(request, read_only=True) else async_engine
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        yield session
 
 
-def get_session():
-    with Session(engine) as session:
+async def get_async_primary_session():
+    """For reads cached beyond the request, e.g. the seat inventory, which must not keep replica lag around"""
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
         yield session
 
 
-SessionDep = Annotated[Session, Depends(get_session)]
\ No newline at end of file
+SessionDep = Annotated[Session, Depends(get_session)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_session)]
+AsyncPrimarySessionDep = Annotated[AsyncSession, Depends(get_async_primary_session)]
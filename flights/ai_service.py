@@ -1,29 +1,43 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import date
 from typing import Any, Sequence
 
-from sqlalchemy import func
 from sqlmodel import select
 
 from ai.factory import get_ai_provider
+from ai.provider import run_blocking_search
+from app.config import get_settings
 from app.websocket_manager import manager
-from db import SessionDep
-from models.flights import Airport, Flight
+from db import AsyncSessionDep
+from flights.cache import reference_cache
+from flights.search_cache import search_cache, search_locks
+from flights.utils import day_bounds
+from models.flights import Flight
 
 
-def find_internal_flights(session: SessionDep, origin_iata: str, destination_iata: str, date: date) -> Sequence[Flight]:
-    
-    origin = session.exec(select(Airport).where(Airport.iata_code == origin_iata)).first()
-    dest = session.exec(select(Airport).where(Airport.iata_code == destination_iata)).first()
+async def find_internal_flights(
+    session: AsyncSessionDep, origin_iata: str, destination_iata: str, date: date
+) -> Sequence[Flight]:
+
+    await reference_cache.ensure_loaded_async(session)
+    origin = reference_cache.airport_by_iata(origin_iata)
+    dest = reference_cache.airport_by_iata(destination_iata)
     if not origin or not dest:
         return []
-    stmt = select(Flight).where(
-        Flight.departure_port_id == origin.id,
-        Flight.destination_port_id == dest.id,
-        func.date(Flight.date_time) == date,
+    day_start, day_end = day_bounds(date)
+    stmt = (
+        select(Flight)
+        .where(
+            Flight.departure_port_id == origin.id,
+            Flight.destination_port_id == dest.id,
+            Flight.date_time >= day_start,
+            Flight.date_time < day_end,
+        )
     )
-    return session.exec(stmt).all()
+    # Callers take airline and airport names from reference_cache, which is loaded by now
+    return (await session.exec(stmt)).all()
 
 
 # def search_flights(session: SessionDep, origin_iata: str, destination_iata: str, date: date) -> tuple[Sequence[Flight], Sequence[ExternalFlight]]:
@@ -33,29 +47,76 @@ def find_internal_flights(session: SessionDep, origin_iata: str, destination_iat
 #     return internal, external
 
 
+# Provider calls in progress in this worker, by search key
+_inflight_searches: dict[str, asyncio.Task] = {}
+
+
 async def notify_external_flights(search_key: str, origin_iata: str, destination_iata: str, dt: date) -> None:
     """
     Runs the external flights search and broadcasts results to websocket subscribers
-    for the given search key ("ORIGIN-DESTINATION-YYYY-MM-DD").
+    for the given search key ("ORIGIN-DESTINATION-YYYY-MM-DD"). Results of a recent identical search
+    are broadcast straight from the search cache, and identical searches arriving while one is in progress
+    join it instead of calling the provider again, so its single broadcast serves them all.
     """
+    task = _inflight_searches.get(search_key)
+    if task is None:
+        task = asyncio.create_task(_search_and_broadcast(search_key, origin_iata, destination_iata, dt))
+        _inflight_searches[search_key] = task
+        task.add_done_callback(lambda _: _inflight_searches.pop(search_key, None))
+    # Shielded, so a cancelled caller does not cancel the search other callers are waiting on
+    await asyncio.shield(task)
+
 
+async def _search_and_broadcast(search_key: str, origin_iata: str, destination_iata: str, dt: date) -> None:
     try:
-        provider = get_ai_provider()
-        results = provider.search_external_flights(origin_iata, destination_iata, dt)
-        payload: list[dict[str, Any]] = [
-            {
-                "airline_name": x.airline_name,
-                "flight_number": x.flight_number,
-                "departure_time": x.departure_time.isoformat(),
-                "arrival_time": x.arrival_time.isoformat() if getattr(x, "arrival_time", None) else None,
-                "departure_iata": x.departure_iata,
-                "destination_iata": x.destination_iata,
-                "airfare": str(x.airfare) if getattr(x, "airfare", None) is not None else None,
-                "booking_url": getattr(x, "booking_url", None),
-            }
-            for x in results
-        ]
-        await manager.broadcast_search_results(search_key, payload)
+        cached = await search_cache.get(search_key)
+        if cached is not None:
+            await manager.broadcast_search_results(search_key, cached)
+            return
+        token = await search_locks.acquire(search_key)
+        if token is None:
+            # Another worker is running this search; its broadcast reaches our subscribers too
+            return
+        try:
+            # The search may have completed between the cache lookup and the lock
+            cached = await search_cache.peek(search_key)
+            if cached is not None:
+                await manager.broadcast_search_results(search_key, cached)
+                return
+            payload = await _search_external_flights(origin_iata, destination_iata, dt)
+            # Providers return no flights when they fail, so an empty answer is not worth keeping
+            if payload:
+                await search_cache.set(search_key, payload)
+            await manager.broadcast_search_results(search_key, payload)
+        finally:
+            await search_locks.release(search_key, token)
     except Exception:
         # Intentionally ignore failures to avoid breaking the response flow.
         pass
+
+
+async def _search_external_flights(origin_iata: str, destination_iata: str, dt: date) -> list[dict[str, Any]]:
+    provider = get_ai_provider()
+    if hasattr(provider, "asearch_external_flights"):
+        search = provider.asearch_external_flights(origin_iata, destination_iata, dt)
+    else:
+        # Providers that only implement the blocking call must not run it on the event loop
+        search = run_blocking_search(provider, origin_iata, destination_iata, dt)
+    try:
+        # A hung upstream must not keep the search, and its subscribers, waiting indefinitely
+        results = await asyncio.wait_for(search, get_settings().AI_SEARCH_DEADLINE)
+    except TimeoutError:
+        results = []
+    return [
+        {
+            "airline_name": x.airline_name,
+            "flight_number": x.flight_number,
+            "departure_time": x.departure_time.isoformat(),
+            "arrival_time": x.arrival_time.isoformat() if getattr(x, "arrival_time", None) else None,
+            "departure_iata": x.departure_iata,
+            "destination_iata": x.destination_iata,
+            "airfare": str(x.airfare) if getattr(x, "airfare", None) is not None else None,
+            "booking_url": getattr(x, "booking_url", None),
+        }
+        for x in results
+    ]
@@ -0,0 +1,140 @@
+import threading
+import time
+
+from pydantic import BaseModel, ConfigDict
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import get_settings
+from db import engine
+from models.flights import Airline, Airport
+
+
+class CachedAirport(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    id: int
+    airport_name: str
+    city: str
+    iata_code: str
+    time_zone: str
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.airport_name}-{self.iata_code}"
+
+
+class CachedAirline(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    id: int
+    airline_name: str
+    email: str
+    contact_phone: str
+    icao_code: str
+
+
+class _Snapshot:
+    def __init__(self, airports: list[CachedAirport], airlines: list[CachedAirline]):
+        self.loaded_at = time.monotonic()
+        self.airports_by_id = {port.id: port for port in airports}
+        self.airports_by_iata = {port.iata_code: port for port in airports}
+        self.airlines_by_id = {airline.id: airline for airline in airlines}
+        self.airlines_by_icao = {airline.icao_code: airline for airline in airlines}
+
+
+class ReferenceDataCache:
+    """
+    Process-local copy of the airport and airline tables, which change far less often than they are read.
+    For lookups and display only: it can be stale on other workers, so permission checks query the database.
+    It is reloaded as a whole: on first use, after `invalidate()` (called by every airport/airline write)
+    and once it is older than the TTL, which bounds staleness for writes handled by other workers.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._snapshot: _Snapshot | None = None
+        # Bumped by invalidate(), so a load that raced with a write does not install stale data
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_fresh(self) -> bool:
+        snapshot = self._snapshot
+        return snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def _install(self, generation: int, airports, airlines):
+        snapshot = _Snapshot(
+            [
+                CachedAirport(
+                    id=port.id,
+                    airport_name=port.airport_name,
+                    city=port.city,
+                    iata_code=port.iata_code,
+                    time_zone=port.time_zone,
+                )
+                for port in airports
+            ],
+            [
+                CachedAirline(
+                    id=airline.id,
+                    airline_name=airline.airline_name,
+                    email=airline.email,
+                    contact_phone=airline.contact_phone,
+                    icao_code=airline.icao_code,
+                )
+                for airline in airlines
+            ],
+        )
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = snapshot
+
+    def load(self, session: Session):
+        generation = self._generation
+        airports = session.exec(select(Airport)).all()
+        airlines = session.exec(select(Airline)).all()
+        self._install(generation, airports, airlines)
+
+    async def load_async(self, session: AsyncSession):
+        generation = self._generation
+        airports = (await session.exec(select(Airport))).all()
+        airlines = (await session.exec(select(Airline))).all()
+        self._install(generation, airports, airlines)
+
+    def ensure_loaded(self, session: Session):
+        if not self.is_fresh:
+            self.load(session)
+
+    async def ensure_loaded_async(self, session: AsyncSession):
+        if not self.is_fresh:
+            await self.load_async(session)
+
+    # Lookups assume ensure_loaded()/ensure_loaded_async() ran first; they return None when not cached
+
+    def airport(self, id: int) -> CachedAirport | None:
+        return self._snapshot.airports_by_id.get(id) if self._snapshot else None
+
+    def airport_by_iata(self, iata_code: str) -> CachedAirport | None:
+        return self._snapshot.airports_by_iata.get(iata_code) if self._snapshot else None
+
+    def airline(self, id: int) -> CachedAirline | None:
+        return self._snapshot.airlines_by_id.get(id) if self._snapshot else None
+
+    def airline_by_icao(self, icao_code: str) -> CachedAirline | None:
+        return self._snapshot.airlines_by_icao.get(icao_code) if self._snapshot else None
+
+
+def warm_reference_cache():
+    """Loads the cache at startup, so the first searches do not pay for it"""
+    with Session(engine) as session:
+        reference_cache.load(session)
+
+
+# Single instance for the entire application
+reference_cache = ReferenceDataCache(ttl=get_settings().REFERENCE_CACHE_TTL)
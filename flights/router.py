@@ -1,15 +1,36 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Annotated
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Path, Query, WebSocket
 from fastapi.responses import JSONResponse
-from sqlmodel import func, select
+from sqlalchemy import tuple_
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.websocket_manager import manager
 from authentication.utils import get_current_active_user, get_settings
-from db import SessionDep
+from db import AsyncPrimarySessionDep, AsyncReadSessionDep, AsyncSessionDep, SessionDep, async_engine
+from flights.cache import reference_cache
+from flights.search_cache import search_cache
+from flights.seat_holds import hold_expiry, new_hold_id, seat_holds
+from flights.seat_inventory import seat_inventory
+from flights.seat_maps import SEAT_MAP_TEMPLATES, bulk_create_seats, expand_cabins, expand_seat_specs, get_template
 from flights.ai_service import find_internal_flights, notify_external_flights
-from flights.utils import generate_booking_ref, process_reservation
+from flights.utils import (
+    FLIGHT_DETAIL_OPTIONS,
+    FLIGHT_LIST_OPTIONS,
+    day_bounds,
+    decode_flight_cursor,
+    encode_flight_cursor,
+    book_seat,
+    cancel_reservation_seat,
+    generate_booking_ref,
+    is_airline_admin,
+    process_reservation,
+    seat_booking_stmt,
+    seat_counters_stmt,
+)
 from models.authentication import User, UserRole
 from models.common import AdminStatus, AirlineAdminLink
 from models.flights import (
@@ -22,18 +43,25 @@ from models.flights import (
     AISearchRequest,
     Flight,
     FlightCreate,
+    FlightPage,
     FlightRead,
     FlightSeat,
+    FlightStatus,
     FlightUpdate,
     PassengerNameRecord,
     PaymentInfo,
     PNRCreate,
     PNRRead,
     ReservationStatus,
+    SeatAvailability,
+    SeatBatchReservation,
+    SeatHoldCreate,
+    SeatHoldRead,
+    SeatMapApply,
+    SeatMapTemplate,
     SeatRead,
     SeatStatus,
     SmallFlight,
-    validate_seat_number,
 )
 
 settings = get_settings()
@@ -60,6 +88,7 @@ def create_airport(
     except Exception as exc_:
         session.rollback()
         raise HTTPException(detail=str(exc_), status_code=400)
+    reference_cache.invalidate()
     return port_
 
 
@@ -108,6 +137,7 @@ def update_airport(
     session.add(stored_port)
     session.commit()
     session.refresh(stored_port)
+    reference_cache.invalidate()
     return stored_port
 
 
@@ -132,6 +162,7 @@ def create_airline(
     except Exception as exc_:
         session.rollback()
         raise HTTPException(detail=str(exc_), status_code=400)
+    reference_cache.invalidate()
     return airline_obj
 
 
@@ -199,6 +230,7 @@ def update_airline(
     session.add(stored_airline)
     session.commit()
     session.refresh(stored_airline)
+    reference_cache.invalidate()
     return stored_airline
 
 
@@ -206,45 +238,99 @@ def update_airline(
 def create_flight(
     flight: FlightCreate, session: SessionDep, current_user: Annotated[User, Depends(get_current_active_user)]
 ):
-    airline = session.get(Airline, flight.airline_id)
+    reference_cache.ensure_loaded(session)
+    airline = reference_cache.airline(flight.airline_id)
     if not airline:
         raise HTTPException(status_code=404, detail="Airline does not exist")
-    if not current_user or not (current_user.role == "Global Admin" or current_user in airline.admins):
+    if not current_user or not (
+        current_user.role == "Global Admin" or is_airline_admin(session, airline.id, current_user.id)
+    ):
         raise HTTPException(status_code=403, detail="Permission denied")
 
     flight_number = f"{airline.icao_code}{flight.flight_number}"
+    day_start, day_end = day_bounds(flight.date_time.date())
     existing_flight = session.exec(
         select(Flight).where(
             Flight.flight_number == flight_number,
-            func.date(Flight.date_time) == flight.date_time.date(),
             Flight.departure_port_id == flight.departure_port_id,
+            Flight.date_time >= day_start,
+            Flight.date_time < day_end,
         )
     ).first()
     if existing_flight:
         raise HTTPException(
             status_code=400, detail="A flight with this number has alreadey been schedulled for this day"
         )
-
-    flight_ = Flight(**flight.model_dump())
+    seat_numbers: list[str] = []
+    if flight.seat_map:
+        try:
+            seat_numbers = expand_cabins(get_template(flight.seat_map).cabins)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    flight_ = Flight(**flight.model_dump(exclude={"seat_map"}))
     setattr(flight_, "flight_number", flight_number)
     session.add(flight_)
     try:
+        session.flush()
+        flight_id = flight_.id
+        bulk_create_seats(session, flight_id, seat_numbers)  # type: ignore
         session.commit()
-        session.refresh(flight_)
     except Exception as exc_:
         session.rollback()
         raise HTTPException(detail=str(exc_), status_code=400)
-    return flight_
-
+    return session.get(Flight, flight_id, options=FLIGHT_DETAIL_OPTIONS, populate_existing=True)
+
+
+@router.get("/flights/", response_model=FlightPage)
+async def list_flights(
+    session: AsyncSessionDep,
+    cursor: Annotated[str | None, Query(description="`next_cursor` from the previous page")] = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    airline_id: int | None = None,
+    departure_port_id: int | None = None,
+    destination_port_id: int | None = None,
+    date_from: Annotated[date | None, Query(description="First departure day, inclusive")] = None,
+    date_to: Annotated[date | None, Query(description="Last departure day, inclusive")] = None,
+    status: FlightStatus | None = None,
+):
+    """Returns flights ordered by departure time, one keyset page at a time"""
+    conditions = []
+    if airline_id is not None:
+        conditions.append(Flight.airline_id == airline_id)
+    if departure_port_id is not None:
+        conditions.append(Flight.departure_port_id == departure_port_id)
+    if destination_port_id is not None:
+        conditions.append(Flight.destination_port_id == destination_port_id)
+    if date_from:
+        conditions.append(Flight.date_time >= day_bounds(date_from)[0])
+    if date_to:
+        conditions.append(Flight.date_time < day_bounds(date_to)[1])
+    if status:
+        conditions.append(Flight.status == status)
+    if cursor:
+        try:
+            last_date_time, last_id = decode_flight_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        conditions.append(tuple_(Flight.date_time, Flight.id) > tuple_(last_date_time, last_id))
 
-@router.get("/flights/", response_model=list[FlightRead])
-def list_flights(session: SessionDep):
-    return session.exec(select(Flight))
+    stmt = (
+        select(Flight)
+        .where(*conditions)
+        .order_by(Flight.date_time, Flight.id)  # type: ignore
+        .limit(limit + 1)
+        .options(*FLIGHT_LIST_OPTIONS)
+    )
+    flights = (await session.exec(stmt)).all()
+    # The extra row only tells whether another page exists
+    next_cursor = encode_flight_cursor(flights[limit - 1]) if len(flights) > limit else None
+    return {"items": flights[:limit], "next_cursor": next_cursor}
 
 
 @router.get("/flights/{id}/", response_model=FlightRead)
-def flight_retrieve(id: Annotated[int, Path(title="The Airport id")], session: SessionDep):
-    flight = session.get(Flight, id)
+async def flight_retrieve(id: Annotated[int, Path(title="The Airport id")], session: AsyncSessionDep):
+    flight = await session.get(Flight, id, options=FLIGHT_DETAIL_OPTIONS)
     if flight is None:
         raise HTTPException(status_code=404, detail="Airport Not found")
     return flight
@@ -254,7 +340,7 @@ def flight_retrieve(id: Annotated[int, Path(title="The Airport id")], session: S
 def update_flight(
     id: int, flight: FlightUpdate, session: SessionDep, current_user: Annotated[User, Depends(get_current_active_user)]
 ):
-    stored_flight = session.get(Flight, id)
+    stored_flight = session.get(Flight, id, options=FLIGHT_DETAIL_OPTIONS)
     if not stored_flight:
         raise HTTPException(status_code=404, detail="Flight not found")
     if not current_user or not (current_user.role == "Global Admin" or current_user in stored_flight.airline.admins):
@@ -271,11 +357,13 @@ def update_flight(
         raise exc
     else:
         flight_number = f"{stored_flight.airline.icao_code}{number_}"
+        day_start, day_end = day_bounds(date_)
         existing_flight = session.exec(
             select(Flight).where(
                 Flight.flight_number == flight_number,
-                func.date(Flight.date_time) == date_,
                 Flight.departure_port_id == dep,
+                Flight.date_time >= day_start,
+                Flight.date_time < day_end,
                 Flight.id != id,
             )
         ).first()
@@ -291,110 +379,234 @@ def update_flight(
 
     session.add(stored_flight)
     session.commit()
-    session.refresh(stored_flight)
-    return stored_flight
+    # Reload with the relationships joined in, as the update may have moved the flight to other airports
+    return session.get(Flight, id, options=FLIGHT_DETAIL_OPTIONS, populate_existing=True)
 
 
-@router.post("/flights/{id}/seats", response_model=list[SeatRead])
-def create_flight_seats(
-    id: int, seats: list[str], session: SessionDep, current_user: Annotated[User, Depends(get_current_active_user)]
-):
-    flight = session.get(Flight, id)
+def _add_seats(flight_id: int, seat_numbers: list[str], session: SessionDep, current_user: User):
+    """Adds the seats the flight does not have yet and returns all of its seats"""
+    flight = session.get(Flight, flight_id)
     if not flight:
         raise HTTPException(status_code=404, detail="Flight not found")
-    if not current_user or not (current_user.role == "Global Admin" or current_user in flight.airline.admins):
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Please login")
+    if not (current_user.role == "Global Admin" or is_airline_admin(session, flight.airline_id, current_user.id)):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    for seat in seats:
-        if not validate_seat_number(seat):
-            raise HTTPException(status_code=400, detail=f"{seat} is not in the right format")
-        else:
-            st = FlightSeat(flight_id=flight.id, seat_number=seat)  # type: ignore
-            session.add(st)
-
     try:
+        bulk_create_seats(session, flight_id, seat_numbers)
         session.commit()
     except Exception as exc_:
         session.rollback()
         raise HTTPException(detail=str(exc_), status_code=400)
-    created_seats = session.exec(select(FlightSeat).where(FlightSeat.flight_id == flight.id))
-    return created_seats
+    seat_inventory.invalidate(flight_id)
+    # Seats resolve their flight from the identity map, so this is a single query
+    return session.exec(select(FlightSeat).where(FlightSeat.flight_id == flight_id)).all()
+
+
+@router.get("/seat-maps/", response_model=list[SeatMapTemplate])
+def list_seat_maps():
+    """Returns the predefined seat-map templates"""
+    return list(SEAT_MAP_TEMPLATES.values())
+
+
+@router.post("/flights/{id}/seats", response_model=list[SeatRead])
+def create_flight_seats(
+    id: int, seats: list[str], session: SessionDep, current_user: Annotated[User, Depends(get_current_active_user)]
+):
+    """Adds seats to the flight. Each entry is a seat (`12C`) or a block of seats (`1A-30F`)"""
+    try:
+        seat_numbers = expand_seat_specs(seats)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return _add_seats(id, seat_numbers, session, current_user)
+
+
+@router.post("/flights/{id}/seat-map", response_model=list[SeatRead])
+def apply_seat_map(
+    id: int,
+    seat_map: SeatMapApply,
+    session: SessionDep,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+):
+    """Generates the flight's seats from a seat-map template or an ad hoc cabin layout"""
+    try:
+        cabins = get_template(seat_map.template).cabins if seat_map.template else seat_map.cabins
+        seat_numbers = expand_cabins(cabins)  # type: ignore
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return _add_seats(id, seat_numbers, session, current_user)
 
 
 @router.get("/flights/{id}/seats", response_model=list[SeatRead])
-def get_flight_seats(id: int, session: SessionDep, current_user: Annotated[User, Depends(get_current_active_user)]):
+async def get_flight_seats(
+    id: int, session: AsyncPrimarySessionDep, current_user: Annotated[User, Depends(get_current_active_user)]
+):
     """Returns all the seats for a given flight"""
-    flight = session.get(Flight, id)
-    if not flight:
+    inventory = await seat_inventory.get_async(session, id)
+    if inventory is None:
         raise HTTPException(status_code=404, detail="Flight not found")
+    return inventory.seat_reads()
 
-    flight_seats = session.exec(select(FlightSeat).where(FlightSeat.flight_id == flight.id))
-    return flight_seats
+
+@router.get("/flights/{id}/availability", response_model=SeatAvailability)
+async def get_flight_availability(id: int, session: AsyncPrimarySessionDep):
+    """Returns the seat counts and the available seat numbers of a flight"""
+    inventory = await seat_inventory.get_async(session, id)
+    if inventory is None:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    unbooked = inventory.available_seat_numbers()
+    held = await seat_holds.owners(id, unbooked)
+    return SeatAvailability(
+        flight_id=id,
+        seats_total=inventory.total,
+        seats_available=len(unbooked) - len(held),
+        seats_held=len(held),
+        available_seats=[seat for seat in unbooked if seat not in held],
+    )
+
+
+@router.post("/flights/{id}/holds", response_model=SeatHoldRead)
+async def hold_flight_seats(
+    id: int,
+    data: SeatHoldCreate,
+    session: AsyncPrimarySessionDep,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+):
+    """
+    Holds seats while the passenger checks out. Holds live in the hold store, not in `flightseat`, and expire
+    on their own after SEAT_HOLD_TTL seconds; pass the hold_id when creating the reservation.
+    """
+    inventory = await seat_inventory.get_async(session, id)
+    if inventory is None:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    seat_numbers = list(dict.fromkeys(data.seat_numbers))
+    unknown = [seat for seat in seat_numbers if not inventory.has_seat(seat)]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Seats not found: {', '.join(unknown)}")
+    booked = [seat for seat in seat_numbers if not inventory.is_available(seat)]
+    if booked:
+        raise HTTPException(status_code=409, detail=f"Seats no longer available: {', '.join(booked)}")
+    hold_id = new_hold_id()
+    held = await seat_holds.acquire(hold_id, id, seat_numbers)
+    if held:
+        raise HTTPException(status_code=409, detail=f"Seats held by another passenger: {', '.join(held)}")
+    return SeatHoldRead(
+        hold_id=hold_id, flight_id=id, seat_numbers=seat_numbers, expires_at=hold_expiry(seat_holds.ttl)
+    )
 
 
-@router.post("/flights/{id}/reserve_seats", response_model=list[SeatRead])
+@router.delete("/holds/{hold_id}")
+async def release_seat_hold(hold_id: str, current_user: Annotated[User, Depends(get_current_active_user)]):
+    """Releases the seats of a hold before it expires, e.g. when the passenger abandons checkout"""
+    if await seat_holds.get(hold_id) is None:
+        raise HTTPException(status_code=404, detail="Hold not found or expired")
+    await seat_holds.release(hold_id)
+    return JSONResponse(content="Hold released")
+
+
+@router.post("/flights/{id}/reserve_seats", response_model=SeatBatchReservation)
 def reserve_flight_seats(
-    id: int, seats: list[int], session: SessionDep, current_user: Annotated[User, Depends(get_current_active_user)]
+    id: int,
+    seats: list[int],
+    session: SessionDep,
+    background_tasks: BackgroundTasks,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    all_or_nothing: Annotated[bool, Query(description="Reserve no seat unless every one is available")] = False,
 ):
-    """Reserve seats without assigning passengers"""
+    """Reserve seats without assigning passengers. All the requested seats are booked by a single statement"""
     flight = session.get(Flight, id)
     if not flight:
         raise HTTPException(status_code=404, detail="Flight not found")
     if not current_user or not (current_user.role == "Global Admin" or current_user in flight.airline.admins):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    for seat in seats:
-        st = session.get(FlightSeat, seat)
-        if not st:
-            raise HTTPException(status_code=404, detail=f"Seat {seat} not found")
-        st.status = SeatStatus.BOOKED
-        session.add(st)
+    requested = list(dict.fromkeys(seats))
+    booked = session.exec(seat_booking_stmt(id, FlightSeat.id.in_(requested))).all()  # type: ignore
+    booked_ids = {row.id for row in booked}
+    unavailable = [seat for seat in requested if seat not in booked_ids]
+    if unavailable and all_or_nothing:
+        session.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Some seats are not available seats of this flight", "unavailable": unavailable},
+        )
+    if booked:
+        # Last, so the flight row is locked only for the commit
+        session.exec(seat_counters_stmt(id, available=-len(booked)))  # type: ignore
 
     try:
         session.commit()
     except Exception as exc_:
         session.rollback()
         raise HTTPException(detail=str(exc_), status_code=400)
-    return JSONResponse(content="Request successful")
+    seat_inventory.set_status(id, [row.seat_number for row in booked], SeatStatus.BOOKED)
+    changes = {row.seat_number: SeatStatus.BOOKED for row in booked}
+    background_tasks.add_task(manager.broadcast_seat_changes, id, changes)
+    small_flight = SmallFlight(id=id, flight_number=flight.flight_number)
+    return SeatBatchReservation(
+        reserved=[
+            SeatRead(id=row.id, seat_number=row.seat_number, status=SeatStatus.BOOKED, flight=small_flight)
+            for row in sorted(booked, key=lambda row: row.id)
+        ],
+        unavailable=unavailable,
+    )
 
 
 @router.post("/reservations/", response_model=PNRRead)
-def create_reservation(
+async def create_reservation(
     data: PNRCreate,
-    session: SessionDep,
+    session: AsyncSessionDep,
     background_tasks: BackgroundTasks,
     current_user: Annotated[User, Depends(get_current_active_user)],
 ):
-    seat = session.exec(
-        select(FlightSeat).where(FlightSeat.seat_number == data.seat_number, FlightSeat.flight_id == data.flight_id)
-    ).first()
-    if seat:
-        seat.status = SeatStatus.BOOKED
-        session.add(seat)
+    # A seat under another passenger's hold is rejected without touching its row
+    holder = (await seat_holds.owners(data.flight_id, [data.seat_number])).get(data.seat_number)
+    if holder is not None and holder != data.hold_id:
+        raise HTTPException(status_code=409, detail=f"Seat {data.seat_number} is held by another passenger")
+    if not await book_seat(session, data.flight_id, data.seat_number):
+        await session.rollback()
+        seat_id = (
+            await session.exec(
+                select(FlightSeat.id).where(
+                    FlightSeat.seat_number == data.seat_number, FlightSeat.flight_id == data.flight_id
+                )
+            )
+        ).first()
+        if seat_id is None:
+            raise HTTPException(status_code=404, detail="Seat not found")
+        seat_inventory.set_status(data.flight_id, [data.seat_number], SeatStatus.BOOKED)
+        raise HTTPException(status_code=409, detail=f"Seat {data.seat_number} is no longer available")
     data_dict = data.model_dump()
     payment_info = data_dict.pop("payment_info")
-    data_dict["booking_reference"] = generate_booking_ref(data.flight_id, session=session)
+    hold_id = data_dict.pop("hold_id")
+    data_dict["booking_reference"] = await generate_booking_ref(data.flight_id, session=session)
     rsv = PassengerNameRecord(**data_dict)
     session.add(rsv)
     try:
-        session.commit()
-        session.refresh(rsv)
+        # Last, so the flight row is locked only for the commit
+        await session.exec(seat_counters_stmt(data.flight_id, available=-1))  # type: ignore
+        await session.commit()
+        # PNRRead reads the airline and airports through the flight, so load them up front
+        rsv = await session.get(
+            PassengerNameRecord,
+            rsv.id,
+            options=[
+                selectinload(PassengerNameRecord.flight).selectinload(Flight.airline),  # type: ignore
+                selectinload(PassengerNameRecord.flight).selectinload(Flight.departure_port),  # type: ignore
+                selectinload(PassengerNameRecord.flight).selectinload(Flight.destination_port),  # type: ignore
+            ],
+            populate_existing=True,
+        )
     except Exception as exc_:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(detail=str(exc_), status_code=400)
+    if hold_id:
+        await seat_holds.release(hold_id, [data.seat_number])
     if rsv:
-        background_tasks.add_task(process_reservation, rsv.id, payment_info, session)  # type: ignore
-        flight_seats = session.exec(select(FlightSeat).where(FlightSeat.flight_id == data.flight_id))
-        flight_seats = [
-            SeatRead(
-                id=st.id,  # type: ignore
-                seat_number=st.seat_number,
-                status=st.status,
-                flight=SmallFlight(id=st.flight.id, flight_number=st.flight.flight_number),  # type: ignore
-            )
-            for st in flight_seats
-        ]
-        background_tasks.add_task(manager.broadcast_seats, data.flight_id, flight_seats)
+        background_tasks.add_task(process_reservation, rsv.id, payment_info)  # type: ignore
+        seat_inventory.set_status(data.flight_id, [data.seat_number], SeatStatus.BOOKED)
+        background_tasks.add_task(manager.broadcast_seat_changes, data.flight_id, {data.seat_number: SeatStatus.BOOKED})
     return rsv
 
 
@@ -438,35 +650,40 @@ def cancel_reservation(
         raise HTTPException(status_code=403, detail="Permission Denied")
     if rsv.status == ReservationStatus.TICKETED:
         raise HTTPException(status_code=400, detail="The reservation is ticketed and cannot be cancelled")
-    seat = session.exec(
-        select(FlightSeat).where(FlightSeat.seat_number == rsv.seat_number, FlightSeat.flight_id == rsv.flight_id)
-    ).first()
-    if seat:
-        seat.status = SeatStatus.AVAILABLE
-        session.add(seat)
-    rsv.status = ReservationStatus.CANCELLED
-    session.add(rsv)
+    if not cancel_reservation_seat(session, rsv):
+        session.rollback()
+        raise HTTPException(status_code=409, detail="The reservation is already cancelled")
     session.commit()
-    flight_seats = session.exec(select(FlightSeat).where(FlightSeat.flight_id == rsv.flight_id))
-    flight_seats = [
-        SeatRead(
-            id=st.id,  # type: ignore
-            seat_number=st.seat_number,
-            status=st.status,
-            flight=SmallFlight(id=st.flight.id, flight_number=st.flight.flight_number),  # type: ignore
-        )
-        for st in flight_seats
-    ]
-    background_tasks.add_task(manager.broadcast_seats, rsv.flight_id, flight_seats)
+    seat_inventory.set_status(rsv.flight_id, [rsv.seat_number], SeatStatus.AVAILABLE)
+    changes = {rsv.seat_number: SeatStatus.AVAILABLE}
+    background_tasks.add_task(manager.broadcast_seat_changes, rsv.flight_id, changes)
     return JSONResponse(content="Reservation cancelled")
 
 
+async def _load_seats(flight_id: int) -> list[SeatRead] | None:
+    # Usually served from the seat inventory; the session only connects when the flight must be loaded
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        inventory = await seat_inventory.get_async(session, flight_id)
+    return inventory.seat_reads() if inventory is not None else None
+
+
 @router.websocket("/ws/flights/{flight_id}/seats")
 async def websocket_seat_updates(websocket: WebSocket, flight_id: int):
-    await manager.connect(websocket, flight_id)
+    """
+    Sends a `seats_snapshot` of every seat, then streams `seat_changed` messages for the flight. Sending
+    "resync" returns a fresh snapshot, e.g. after the client spots a gap in the sequence numbers. Idle clients
+    get a `ping` to answer with "pong".
+    """
+    snapshot = await manager.seats_snapshot(flight_id, lambda: _load_seats(flight_id))
+    subscriber = await manager.connect(websocket, flight_id, snapshot)
     try:
         while True:
-            await websocket.receive_text()
+            message = await websocket.receive_text()
+            subscriber.seen()
+            if message == "resync":
+                snapshot = await manager.seats_snapshot(flight_id, lambda: _load_seats(flight_id))
+                if snapshot is not None:
+                    manager.send_seats_snapshot(websocket, flight_id, snapshot)
     except Exception:
         manager.disconnect(flight_id, websocket)
 
@@ -480,18 +697,23 @@ async def websocket_search_updates(websocket: WebSocket, origin: str, destinatio
         # If date is invalid, just close connection
         return
     key = f"{origin.upper()}-{destination.upper()}-{date_obj.isoformat()}"
-    await manager.connect_search(websocket, key)
+    # Results of a recent identical search are sent right away
+    cached = await search_cache.peek(key)
+    subscriber = await manager.connect_search(
+        websocket, key, manager.search_results_frame(cached) if cached is not None else None
+    )
     try:
         while True:
             await websocket.receive_text()
+            subscriber.seen()
     except Exception:
         manager.disconnect_search(key, websocket)
 
 
 @router.post("/search")
-def ai_search(
+async def ai_search(
     payload: AISearchRequest,
-    session: SessionDep,
+    session: AsyncReadSessionDep,
     background_tasks: BackgroundTasks,
 ):
     try:
@@ -503,19 +725,26 @@ def ai_search(
     destination = payload.destination_iata.upper()
 
     # Return internal results immediately
-    internal = find_internal_flights(session, origin, destination, date_obj)
-    internal_flights = [
-        {
-            "id": f.id,
-            "flight_number": f.flight_number,
-            "airline": f.airline.airline_name if f.airline else None,
-            "date_time": f.date_time.isoformat(),
-            "departure_port": f.departure_port.full_name if f.departure_port else None,
-            "destination_port": f.destination_port.full_name if f.destination_port else None,
-            "airfare": str(f.airfare) if f.airfare is not None else None,
-        }
-        for f in internal
-    ]
+    internal = await find_internal_flights(session, origin, destination, date_obj)
+    # Names come from the reference cache, which find_internal_flights loaded, rather than from more queries
+    departure_port = reference_cache.airport_by_iata(origin)
+    destination_port = reference_cache.airport_by_iata(destination)
+    internal_flights = []
+    for f in internal:
+        airline = reference_cache.airline(f.airline_id)
+        internal_flights.append(
+            {
+                "id": f.id,
+                "flight_number": f.flight_number,
+                "airline": airline.airline_name if airline else None,
+                "date_time": f.date_time.isoformat(),
+                "departure_port": departure_port.full_name if departure_port else None,
+                "destination_port": destination_port.full_name if destination_port else None,
+                "airfare": str(f.airfare) if f.airfare is not None else None,
+                "seats_total": f.seats_total,
+                "seats_available": f.seats_available,
+            }
+        )
 
     # Always dispatch external search to websocket subscribers
     search_key = f"{origin}-{destination}-{date_obj.isoformat()}"
@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from redis.asyncio import Redis
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+SearchResults = list[dict[str, Any]]
+
+
+class SearchCacheStats:
+    """Lookup counters of this worker, to tune AI_SEARCH_CACHE_TTL"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class MemorySearchCache:
+    """In-process LRU of external search results, each entry expiring after the TTL"""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = SearchCacheStats()
+        self._entries: OrderedDict[str, tuple[float, SearchResults]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def peek(self, search_key: str) -> SearchResults | None:
+        """Returns the cached results without counting the lookup"""
+        with self._lock:
+            entry = self._entries.get(search_key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[search_key]
+                return None
+            self._entries.move_to_end(search_key)
+            return entry[1]
+
+    async def get(self, search_key: str) -> SearchResults | None:
+        results = await self.peek(search_key)
+        self.stats.record(results is not None)
+        return results
+
+    async def set(self, search_key: str, results: SearchResults):
+        with self._lock:
+            self._entries[search_key] = (time.monotonic() + self.ttl, results)
+            self._entries.move_to_end(search_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisSearchCache:
+    """
+    External search results shared by all workers, stored as JSON with the TTL as the key expiry. While Redis is
+    unreachable, lookups and writes go to an in-process LRU instead.
+    """
+
+    def __init__(self, redis: Redis, ttl: int, max_entries: int, prefix: str = "ai_search"):
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = SearchCacheStats()
+        self.fallback = MemorySearchCache(ttl, max_entries)
+
+    def _key(self, search_key: str) -> str:
+        return f"{self.prefix}:{search_key}"
+
+    async def peek(self, search_key: str) -> SearchResults | None:
+        try:
+            value = await self.redis.get(self._key(search_key))
+        except Exception:
+            logger.warning("Search cache unavailable, using the in-process cache", exc_info=True)
+            return await self.fallback.peek(search_key)
+        return json.loads(value) if value is not None else None
+
+    async def get(self, search_key: str) -> SearchResults | None:
+        results = await self.peek(search_key)
+        self.stats.record(results is not None)
+        return results
+
+    async def set(self, search_key: str, results: SearchResults):
+        try:
+            await self.redis.set(self._key(search_key), json.dumps(results), ex=self.ttl)
+        except Exception:
+            logger.warning("Search cache unavailable, using the in-process cache", exc_info=True)
+            await self.fallback.set(search_key, results)
+
+
+# Deletes the lock only if it still holds our token, so a lock that expired and was taken over is left alone
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class MemorySearchLocks:
+    """In-process equivalent of RedisSearchLocks, for tests"""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._locks: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    async def acquire(self, search_key: str) -> str | None:
+        """Returns a token to release the lock with, or None if another search holds it"""
+        now = time.monotonic()
+        with self._lock:
+            held = self._locks.get(search_key)
+            if held is not None and held[1] > now:
+                return None
+            token = secrets.token_hex(8)
+            self._locks[search_key] = (token, now + self.ttl)
+            return token
+
+    async def release(self, search_key: str, token: str):
+        with self._lock:
+            if self._locks.get(search_key, (None,))[0] == token:
+                del self._locks[search_key]
+
+
+class RedisSearchLocks:
+    """
+    Short-lived locks that let one worker at a time run the provider call of a search. They expire after the
+    TTL, so a worker that dies mid-search blocks the key for at most that long.
+    """
+
+    def __init__(self, redis: Redis, ttl: int, prefix: str = "ai_search_lock"):
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self._release = redis.register_script(RELEASE_LOCK_SCRIPT)
+
+    def _key(self, search_key: str) -> str:
+        return f"{self.prefix}:{search_key}"
+
+    async def acquire(self, search_key: str) -> str | None:
+        token = secrets.token_hex(8)
+        try:
+            acquired = await self.redis.set(self._key(search_key), token, nx=True, ex=self.ttl)
+        except Exception:
+            # Without Redis, searches are only coalesced within the worker
+            logger.warning("Search locks unavailable", exc_info=True)
+            return token
+        return token if acquired else None
+
+    async def release(self, search_key: str, token: str):
+        try:
+            await self._release(keys=[self._key(search_key)], args=[token])
+        except Exception:
+            logger.warning("Search locks unavailable", exc_info=True)
+
+
+def build_search_cache():
+    settings = get_settings()
+    # Tests run without Redis
+    if "PYTEST_CURRENT_TEST" in os.environ or "pytest" in sys.modules:
+        return MemorySearchCache(settings.AI_SEARCH_CACHE_TTL, settings.AI_SEARCH_CACHE_SIZE)
+    redis = Redis.from_url(settings.REDIS_URL)
+    return RedisSearchCache(redis, settings.AI_SEARCH_CACHE_TTL, settings.AI_SEARCH_CACHE_SIZE)
+
+
+def build_search_locks():
+    settings = get_settings()
+    # Tests run without Redis
+    if "PYTEST_CURRENT_TEST" in os.environ or "pytest" in sys.modules:
+        return MemorySearchLocks(settings.AI_SEARCH_LOCK_TTL)
+    return RedisSearchLocks(Redis.from_url(settings.REDIS_URL), settings.AI_SEARCH_LOCK_TTL)
+
+
+# Single instances for the entire application
+search_cache = build_search_cache()
+search_locks = build_search_locks()
@@ -0,0 +1,179 @@
+import os
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from redis.asyncio import Redis
+
+from app.config import get_settings
+
+# Claims every seat for the hold, or none of them if one is claimed by another hold. KEYS: the hold key, then
+# the seat keys; ARGV: hold id, TTL in ms, hold value. Returns the (1-based) indexes of the conflicting seats.
+ACQUIRE_SCRIPT = """
+local conflicts = {}
+for i = 2, #KEYS do
+    local owner = redis.call('GET', KEYS[i])
+    if owner and owner ~= ARGV[1] then
+        table.insert(conflicts, i - 1)
+    end
+end
+if #conflicts > 0 then
+    return conflicts
+end
+for i = 2, #KEYS do
+    redis.call('SET', KEYS[i], ARGV[1], 'PX', ARGV[2])
+end
+redis.call('SET', KEYS[1], ARGV[3], 'PX', ARGV[2])
+return conflicts
+"""
+
+# Deletes the seat keys still owned by the hold. KEYS: the seat keys; ARGV: hold id
+RELEASE_SCRIPT = """
+for i = 1, #KEYS do
+    if redis.call('GET', KEYS[i]) == ARGV[1] then
+        redis.call('DEL', KEYS[i])
+    end
+end
+return 1
+"""
+
+
+def new_hold_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def hold_expiry(ttl: int) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=ttl)
+
+
+class MemorySeatHoldStore:
+    """In-process seat holds for tests and single-worker runs. Expired holds are ignored and pruned on access"""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        # (flight_id, seat_number) -> (hold_id, expires_at)
+        self._seats: dict[tuple[int, str], tuple[str, float]] = {}
+        # hold_id -> (flight_id, seat_numbers, expires_at)
+        self._holds: dict[str, tuple[int, list[str], float]] = {}
+        self._lock = threading.Lock()
+
+    def _owner(self, key: tuple[int, str], now: float) -> str | None:
+        entry = self._seats.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._seats[key]
+            return None
+        return entry[0]
+
+    async def acquire(self, hold_id: str, flight_id: int, seat_numbers: list[str]) -> list[str]:
+        """Holds all the seats, or none. Returns the seats held by another hold"""
+        now = time.monotonic()
+        expires_at = now + self.ttl
+        with self._lock:
+            conflicts = [seat for seat in seat_numbers if self._owner((flight_id, seat), now) not in (None, hold_id)]
+            if conflicts:
+                return conflicts
+            for seat in seat_numbers:
+                self._seats[(flight_id, seat)] = (hold_id, expires_at)
+            self._holds[hold_id] = (flight_id, seat_numbers, expires_at)
+            return []
+
+    async def get(self, hold_id: str) -> tuple[int, list[str]] | None:
+        with self._lock:
+            hold = self._holds.get(hold_id)
+            if hold is None:
+                return None
+            if hold[2] <= time.monotonic():
+                del self._holds[hold_id]
+                return None
+            return hold[0], hold[1]
+
+    async def owners(self, flight_id: int, seat_numbers: list[str]) -> dict[str, str]:
+        """Maps the given seats that are currently held to their hold id"""
+        now = time.monotonic()
+        with self._lock:
+            owners = {seat: self._owner((flight_id, seat), now) for seat in seat_numbers}
+        return {seat: owner for seat, owner in owners.items() if owner}
+
+    async def release(self, hold_id: str, seat_numbers: list[str] | None = None):
+        """Releases the given seats of the hold, or the whole hold"""
+        with self._lock:
+            hold = self._holds.get(hold_id)
+            if hold is None:
+                return
+            flight_id, held, expires_at = hold
+            for seat in held if seat_numbers is None else seat_numbers:
+                if self._seats.get((flight_id, seat), (None,))[0] == hold_id:
+                    del self._seats[(flight_id, seat)]
+            remaining = [] if seat_numbers is None else [seat for seat in held if seat not in seat_numbers]
+            if remaining:
+                self._holds[hold_id] = (flight_id, remaining, expires_at)
+            else:
+                del self._holds[hold_id]
+
+
+class RedisSeatHoldStore:
+    """
+    Seat holds shared by all workers. Every held seat is a key holding the hold id, written with the hold's TTL,
+    so Redis expires abandoned holds by itself and checking a seat is a single GET.
+    """
+
+    def __init__(self, redis: Redis, ttl: int, prefix: str = "seat_hold"):
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self._acquire = redis.register_script(ACQUIRE_SCRIPT)
+        self._release = redis.register_script(RELEASE_SCRIPT)
+
+    def _hold_key(self, hold_id: str) -> str:
+        return f"{self.prefix}:hold:{hold_id}"
+
+    def _seat_key(self, flight_id: int, seat_number: str) -> str:
+        return f"{self.prefix}:seat:{flight_id}:{seat_number}"
+
+    async def acquire(self, hold_id: str, flight_id: int, seat_numbers: list[str]) -> list[str]:
+        keys = [self._hold_key(hold_id)] + [self._seat_key(flight_id, seat) for seat in seat_numbers]
+        value = f"{flight_id}|{','.join(seat_numbers)}"
+        conflicts = await self._acquire(keys=keys, args=[hold_id, self.ttl * 1000, value])
+        return [seat_numbers[int(i) - 1] for i in conflicts]
+
+    async def get(self, hold_id: str) -> tuple[int, list[str]] | None:
+        value = await self.redis.get(self._hold_key(hold_id))
+        if value is None:
+            return None
+        flight_id, seats = value.decode().split("|")
+        return int(flight_id), [seat for seat in seats.split(",") if seat]
+
+    async def owners(self, flight_id: int, seat_numbers: list[str]) -> dict[str, str]:
+        if not seat_numbers:
+            return {}
+        values = await self.redis.mget([self._seat_key(flight_id, seat) for seat in seat_numbers])
+        return {seat: value.decode() for seat, value in zip(seat_numbers, values) if value is not None}
+
+    async def release(self, hold_id: str, seat_numbers: list[str] | None = None):
+        hold = await self.get(hold_id)
+        if hold is None:
+            return
+        flight_id, held = hold
+        to_release = held if seat_numbers is None else seat_numbers
+        await self._release(keys=[self._seat_key(flight_id, seat) for seat in to_release], args=[hold_id])
+        remaining = [seat for seat in held if seat not in to_release]
+        if remaining:
+            await self.redis.set(self._hold_key(hold_id), f"{flight_id}|{','.join(remaining)}", keepttl=True)
+        else:
+            await self.redis.delete(self._hold_key(hold_id))
+
+
+def build_seat_hold_store():
+    settings = get_settings()
+    # Tests run without Redis
+    if "PYTEST_CURRENT_TEST" in os.environ or "pytest" in sys.modules:
+        return MemorySeatHoldStore(ttl=settings.SEAT_HOLD_TTL)
+    return RedisSeatHoldStore(Redis.from_url(settings.REDIS_URL), ttl=settings.SEAT_HOLD_TTL)
+
+
+# Single instance for the entire application
+seat_holds = build_seat_hold_store()
@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable
+
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import get_settings
+from models.flights import Flight, FlightSeat, SeatRead, SeatStatus, SmallFlight
+
+
+class FlightSeatInventory:
+    """
+    Seats of one flight, indexed in seat id order. Availability is a bitset (a Python int) where bit i is set
+    when seat i is booked, so counts cost O(seats / 64) and a status change is a single bit flip.
+    """
+
+    def __init__(self, flight_id: int, flight_number: str, seats: Iterable[tuple[int, str, str]]):
+        self.flight_id = flight_id
+        self.flight_number = flight_number
+        self.loaded_at = time.monotonic()
+        self.seat_ids: list[int] = []
+        self.seat_numbers: list[str] = []
+        self.booked = 0
+        for index, (seat_id, seat_number, status) in enumerate(seats):
+            self.seat_ids.append(seat_id)
+            self.seat_numbers.append(seat_number)
+            if status == SeatStatus.BOOKED:
+                self.booked |= 1 << index
+        self._index = {seat_number: index for index, seat_number in enumerate(self.seat_numbers)}
+
+    @property
+    def total(self) -> int:
+        return len(self.seat_ids)
+
+    @property
+    def available(self) -> int:
+        return self.total - self.booked.bit_count()
+
+    def has_seat(self, seat_number: str) -> bool:
+        return seat_number in self._index
+
+    def is_available(self, seat_number: str) -> bool:
+        index = self._index.get(seat_number)
+        return index is not None and not (self.booked >> index) & 1
+
+    def set_status(self, seat_number: str, status: SeatStatus) -> bool:
+        """Returns False for seats this inventory does not know about"""
+        index = self._index.get(seat_number)
+        if index is None:
+            return False
+        if status == SeatStatus.BOOKED:
+            self.booked |= 1 << index
+        else:
+            self.booked &= ~(1 << index)
+        return True
+
+    def status(self, index: int) -> SeatStatus:
+        return SeatStatus.BOOKED if (self.booked >> index) & 1 else SeatStatus.AVAILABLE
+
+    def available_seat_numbers(self) -> list[str]:
+        return [seat for index, seat in enumerate(self.seat_numbers) if not (self.booked >> index) & 1]
+
+    def seat_reads(self) -> list[SeatRead]:
+        flight = SmallFlight(id=self.flight_id, flight_number=self.flight_number)
+        return [
+            SeatRead(id=seat_id, seat_number=seat_number, status=self.status(index), flight=flight)
+            for index, (seat_id, seat_number) in enumerate(zip(self.seat_ids, self.seat_numbers))
+        ]
+
+
+class SeatInventory:
+    """
+    Per-worker registry of flight seat inventories, loaded lazily from `flightseat` and kept current by the
+    booking paths of this worker. Entries expire after the TTL, which bounds how stale a worker can be about
+    bookings made elsewhere (other workers, Celery tasks); seat writes themselves are checked in the database.
+    Load with a session on the primary: an inventory read from a lagging replica would stay stale for the TTL.
+    """
+
+    def __init__(self, ttl: float, max_flights: int = 10_000):
+        self.ttl = ttl
+        self.max_flights = max_flights
+        self._flights: OrderedDict[int, FlightSeatInventory] = OrderedDict()
+        # Bumped on every change to a flight, so a load that raced with a booking is not installed
+        self._generations: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def peek(self, flight_id: int) -> FlightSeatInventory | None:
+        """Returns the flight's inventory if it is loaded and fresh"""
+        with self._lock:
+            inventory = self._flights.get(flight_id)
+            if inventory is None:
+                return None
+            if time.monotonic() - inventory.loaded_at >= self.ttl:
+                del self._flights[flight_id]
+                return None
+            self._flights.move_to_end(flight_id)
+            return inventory
+
+    def _install(self, generation: int, inventory: FlightSeatInventory):
+        with self._lock:
+            if self._generations.get(inventory.flight_id, 0) != generation:
+                return
+            self._flights[inventory.flight_id] = inventory
+            self._flights.move_to_end(inventory.flight_id)
+            while len(self._flights) > self.max_flights:
+                evicted, _ = self._flights.popitem(last=False)
+                self._generations.pop(evicted, None)
+
+    def _seats_stmt(self, flight_id: int):
+        return (
+            select(FlightSeat.id, FlightSeat.seat_number, FlightSeat.status)
+            .where(FlightSeat.flight_id == flight_id)
+            .order_by(FlightSeat.id)  # type: ignore
+        )
+
+    def get(self, session: Session, flight_id: int) -> FlightSeatInventory | None:
+        """Returns the flight's inventory, loading it if needed, or None if the flight does not exist"""
+        inventory = self.peek(flight_id)
+        if inventory is not None:
+            return inventory
+        generation = self._generations.get(flight_id, 0)
+        flight_number = session.exec(select(Flight.flight_number).where(Flight.id == flight_id)).first()
+        if flight_number is None:
+            return None
+        inventory = FlightSeatInventory(flight_id, flight_number, session.exec(self._seats_stmt(flight_id)).all())
+        self._install(generation, inventory)
+        return inventory
+
+    async def get_async(self, session: AsyncSession, flight_id: int) -> FlightSeatInventory | None:
+        inventory = self.peek(flight_id)
+        if inventory is not None:
+            return inventory
+        generation = self._generations.get(flight_id, 0)
+        flight_number = (await session.exec(select(Flight.flight_number).where(Flight.id == flight_id))).first()
+        if flight_number is None:
+            return None
+        seats = (await session.exec(self._seats_stmt(flight_id))).all()
+        inventory = FlightSeatInventory(flight_id, flight_number, seats)
+        self._install(generation, inventory)
+        return inventory
+
+    def set_status(self, flight_id: int, seat_numbers: Iterable[str], status: SeatStatus):
+        """Applies committed seat status changes; call it after the transaction commits"""
+        with self._lock:
+            self._generations[flight_id] = self._generations.get(flight_id, 0) + 1
+            inventory = self._flights.get(flight_id)
+            if inventory is None:
+                return
+            for seat_number in seat_numbers:
+                if not inventory.set_status(seat_number, status):
+                    # Seat added since the load; the next read reloads the flight
+                    del self._flights[flight_id]
+                    return
+
+    def invalidate(self, flight_id: int):
+        """Drops the flight's inventory, e.g. after seats were added to it"""
+        with self._lock:
+            self._generations[flight_id] = self._generations.get(flight_id, 0) + 1
+            self._flights.pop(flight_id, None)
+
+
+# Single instance for the entire application
+seat_inventory = SeatInventory(ttl=get_settings().SEAT_INVENTORY_TTL)
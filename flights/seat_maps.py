@@ -0,0 +1,133 @@
+import re
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session
+
+from flights.utils import seat_counters_stmt
+from models.common import utcnow
+from models.flights import FlightSeat, SeatMapCabin, SeatMapTemplate, SeatStatus
+
+# Same letters and row bounds as models.flights.validate_seat_number
+SEAT_LETTERS = "ABCDEFG"
+MAX_ROW = 999
+
+SEAT_RE = re.compile(r"^(\d{1,3})([A-G])$")
+
+SEAT_MAP_TEMPLATES: dict[str, SeatMapTemplate] = {
+    template.name: template
+    for template in (
+        SeatMapTemplate(
+            name="A320",
+            cabins=[
+                SeatMapCabin(name="Business", first_row=1, last_row=3, letters="ACDF"),
+                SeatMapCabin(name="Economy", first_row=4, last_row=30, letters="ABCDEF", exclude=["13A-13F"]),
+            ],
+        ),
+        SeatMapTemplate(
+            name="B737-800",
+            cabins=[
+                SeatMapCabin(name="Business", first_row=1, last_row=4, letters="ACDF"),
+                SeatMapCabin(name="Economy", first_row=5, last_row=32, letters="ABCDEF", exclude=["13A-13F"]),
+            ],
+        ),
+        SeatMapTemplate(
+            name="B777-300ER",
+            cabins=[
+                SeatMapCabin(name="Business", first_row=1, last_row=8, letters="ACDG"),
+                SeatMapCabin(name="Premium Economy", first_row=10, last_row=14, letters="ABCDEFG", exclude=["13A-13G"]),
+                SeatMapCabin(name="Economy", first_row=20, last_row=58, letters="ABCDEFG"),
+            ],
+        ),
+        SeatMapTemplate(
+            name="E190",
+            cabins=[
+                SeatMapCabin(name="Business", first_row=1, last_row=3, letters="ACD"),
+                SeatMapCabin(name="Economy", first_row=4, last_row=26, letters="ACDF"),
+            ],
+        ),
+    )
+}
+
+
+def _parse_seat(seat: str) -> tuple[int, str]:
+    match = SEAT_RE.match(seat.strip().upper())
+    if not match or not (1 <= int(match.group(1)) <= MAX_ROW):
+        raise ValueError(f"{seat} is not in the right format")
+    return int(match.group(1)), match.group(2)
+
+
+def expand_seat_range(spec: str) -> list[str]:
+    """Expands a seat (`12C`) or a block of seats (`1A-30F`: rows 1 to 30, letters A to F) to seat numbers"""
+    if "-" not in spec:
+        row, letter = _parse_seat(spec)
+        return [f"{row}{letter}"]
+    start, _, end = spec.partition("-")
+    first_row, first_letter = _parse_seat(start)
+    last_row, last_letter = _parse_seat(end)
+    if first_row > last_row or first_letter > last_letter:
+        raise ValueError(f"{spec} is not a valid seat range")
+    letters = SEAT_LETTERS[SEAT_LETTERS.index(first_letter) : SEAT_LETTERS.index(last_letter) + 1]
+    return [f"{row}{letter}" for row in range(first_row, last_row + 1) for letter in letters]
+
+
+def expand_seat_specs(specs: list[str]) -> list[str]:
+    """Expands seats and seat ranges, keeping the first occurrence of any repeated seat"""
+    seats: dict[str, None] = {}
+    for spec in specs:
+        seats.update(dict.fromkeys(expand_seat_range(spec)))
+    return list(seats)
+
+
+def expand_cabins(cabins: list[SeatMapCabin]) -> list[str]:
+    seats: list[str] = []
+    for cabin in cabins:
+        letters = cabin.letters.upper()
+        if not letters or any(letter not in SEAT_LETTERS for letter in letters):
+            raise ValueError(f"Cabin {cabin.name}: seat letters must be taken from {SEAT_LETTERS}")
+        if not (1 <= cabin.first_row <= cabin.last_row <= MAX_ROW):
+            raise ValueError(f"Cabin {cabin.name}: rows must be between 1 and {MAX_ROW}")
+        excluded = set(expand_seat_specs(cabin.exclude))
+        seats.extend(
+            seat
+            for row in range(cabin.first_row, cabin.last_row + 1)
+            for seat in (f"{row}{letter}" for letter in letters)
+            if seat not in excluded
+        )
+    return expand_seat_specs(seats)
+
+
+def get_template(name: str) -> SeatMapTemplate:
+    template = SEAT_MAP_TEMPLATES.get(name)
+    if template is None:
+        raise ValueError(f"Unknown seat-map template {name}. Available: {', '.join(SEAT_MAP_TEMPLATES)}")
+    return template
+
+
+def bulk_create_seats(session: Session, flight_id: int, seat_numbers: list[str]) -> int:
+    """
+    Adds the seats to the flight with a single multi-row INSERT, skipping seats the flight already has,
+    and returns how many were created. The caller commits.
+    """
+    if not seat_numbers:
+        return 0
+    now = utcnow()
+    rows = [
+        {
+            "flight_id": flight_id,
+            "seat_number": seat,
+            "status": SeatStatus.AVAILABLE.value,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for seat in seat_numbers
+    ]
+    stmt = (
+        insert(FlightSeat)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["flight_id", "seat_number"])
+        .returning(FlightSeat.id)  # type: ignore
+    )
+    created = len(session.exec(stmt).all())  # type: ignore
+    if created:
+        session.exec(seat_counters_stmt(flight_id, total=created, available=created))  # type: ignore
+    return created
@@ -1,10 +1,143 @@
-from datetime import datetime
+import base64
+from datetime import date, datetime, time, timedelta
 
-from sqlmodel import select
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import Session, select
 
 from common.utils import send_email
-from db import SessionDep
-from models.flights import Flight, PassengerNameRecord, ReservationStatus
+from db import AsyncSessionDep, SessionDep, engine
+from models.common import AdminStatus, AirlineAdminLink, utcnow
+from models.flights import Flight, FlightSeat, PassengerNameRecord, ReservationStatus, SeatStatus
+
+
+# Loader options behind every FlightRead response. Lists use one IN query per relationship, so airlines and
+# airports shared by many rows are fetched once per page; single flights join them into the flight query.
+FLIGHT_LIST_OPTIONS = (
+    selectinload(Flight.airline),  # type: ignore
+    selectinload(Flight.departure_port),  # type: ignore
+    selectinload(Flight.destination_port),  # type: ignore
+)
+FLIGHT_DETAIL_OPTIONS = (
+    joinedload(Flight.airline),  # type: ignore
+    joinedload(Flight.departure_port),  # type: ignore
+    joinedload(Flight.destination_port),  # type: ignore
+)
+
+
+def day_bounds(day: date) -> tuple[datetime, datetime]:
+    """Half-open [start, end) range of a day, so date filters stay index range scans unlike func.date()"""
+    start = datetime.combine(day, time())
+    return start, start + timedelta(days=1)
+
+
+def encode_flight_cursor(flight: Flight) -> str:
+    """Opaque keyset cursor pointing just after the given flight in (date_time, id) order"""
+    raw = f"{flight.date_time.isoformat()}|{flight.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_flight_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ValueError if the cursor was not produced by `encode_flight_cursor`"""
+    try:
+        date_time, id_ = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        last_date_time, last_id = datetime.fromisoformat(date_time), int(id_)
+        # Flight times are naive, and ids are int4; anything else would fail in the database instead
+        if last_date_time.tzinfo is not None or not 0 < last_id < 2**31:
+            raise ValueError(cursor)
+        return last_date_time, last_id
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def is_airline_admin(session: SessionDep, airline_id: int | None, user_id: int | None) -> bool:
+    """Checks the database rather than the reference cache, so a revoked admin loses access on every worker at once"""
+    link = session.exec(
+        select(AirlineAdminLink.user_id).where(
+            AirlineAdminLink.airline_id == airline_id,
+            AirlineAdminLink.user_id == user_id,
+            AirlineAdminLink.status == AdminStatus.ACTIVE,
+        )
+    ).first()
+    return link is not None
+
+
+def seat_booking_stmt(flight_id: int, *criteria):
+    """
+    UPDATE that books the flight's seats matching `criteria` that are still available, returning the booked
+    (id, seat_number) rows. Concurrent bookings of a seat queue on its row lock and re-check the status once
+    the first one commits, so exactly one of them gets the row back.
+    """
+    return (
+        update(FlightSeat)
+        .where(FlightSeat.flight_id == flight_id, FlightSeat.status == SeatStatus.AVAILABLE, *criteria)  # type: ignore
+        .values(status=SeatStatus.BOOKED, updated_at=utcnow())
+        .returning(FlightSeat.id, FlightSeat.seat_number)  # type: ignore
+    )
+
+
+def seat_release_stmt(flight_id: int, seat_number: str):
+    """
+    UPDATE that frees the seat if it is booked, returning its id. Of concurrent releases of a seat, only the
+    first gets the row back, so only it may return the seat to the flight's counters.
+    """
+    return (
+        update(FlightSeat)
+        .where(
+            FlightSeat.flight_id == flight_id,  # type: ignore
+            FlightSeat.seat_number == seat_number,  # type: ignore
+            FlightSeat.status == SeatStatus.BOOKED,  # type: ignore
+        )
+        .values(status=SeatStatus.AVAILABLE, updated_at=utcnow())
+        .returning(FlightSeat.id)  # type: ignore
+    )
+
+
+def reservation_cancel_stmt(reservation_id: int):
+    """UPDATE that cancels the reservation unless it is already cancelled or ticketed, returning its id"""
+    return (
+        update(PassengerNameRecord)
+        .where(
+            PassengerNameRecord.id == reservation_id,  # type: ignore
+            PassengerNameRecord.status == ReservationStatus.BOOKED,  # type: ignore
+        )
+        .values(status=ReservationStatus.CANCELLED, updated_at=utcnow())
+        .returning(PassengerNameRecord.id)  # type: ignore
+    )
+
+
+def seat_counters_stmt(flight_id: int, total: int = 0, available: int = 0):
+    """
+    UPDATE that shifts the flight's seat counters, in the transaction that changes the seats. It locks the
+    flight row, which every booking of the flight needs, so run it as the last statement before committing.
+    """
+    return (
+        update(Flight)
+        .where(Flight.id == flight_id)  # type: ignore
+        .values(seats_total=Flight.seats_total + total, seats_available=Flight.seats_available + available)
+    )
+
+
+async def book_seat(session: AsyncSessionDep, flight_id: int, seat_number: str) -> bool:
+    """
+    Books the seat if it is still available. The caller then runs `seat_counters_stmt(flight_id, available=-1)`
+    right before committing, or rolls back to release the seat
+    """
+    booked = await session.exec(seat_booking_stmt(flight_id, FlightSeat.seat_number == seat_number))
+    return booked.first() is not None
+
+
+def cancel_reservation_seat(session: SessionDep, reservation: PassengerNameRecord) -> bool:
+    """
+    Cancels the reservation and frees its seat, returning False if the reservation is no longer booked
+    (e.g. a concurrent cancel got there first). Returns the seat to the counters only if it was booked, so a
+    seat is never counted free twice. The caller commits.
+    """
+    if session.exec(reservation_cancel_stmt(reservation.id)).first() is None:  # type: ignore
+        return False
+    if session.exec(seat_release_stmt(reservation.flight_id, reservation.seat_number)).first() is not None:
+        session.exec(seat_counters_stmt(reservation.flight_id, available=1))  # type: ignore
+    return True
 
 
 def send_ticket_email(rsv):
@@ -37,11 +170,11 @@ def send_ticket_email(rsv):
         """
     send_email(rsv.email,"Flight Ticket", msg)
 
-def generate_booking_ref(flight_id, session: SessionDep):
-    flight = session.get(Flight, flight_id)
+async def generate_booking_ref(flight_id, session: AsyncSessionDep):
+    flight = await session.get(Flight, flight_id, options=[selectinload(Flight.airline)])  # type: ignore
     if not flight:
         raise ValueError(f"Flight with id {flight_id} not found")
-    records = session.exec(select(PassengerNameRecord).where(PassengerNameRecord.flight_id == flight.id).order_by(PassengerNameRecord.booking_reference.desc())) # type: ignore
+    records = await session.exec(select(PassengerNameRecord).where(PassengerNameRecord.flight_id == flight.id).order_by(PassengerNameRecord.booking_reference.desc())) # type: ignore
     last_record = records.first()
     yr = datetime.now().year
     if last_record and last_record.booking_reference:
@@ -74,7 +207,11 @@ def process_payment(payment_info):
     pass
 
 
-def process_reservation(pnr_id:int, payment_info, session: SessionDep):
+def process_reservation(pnr_id:int, payment_info, session: SessionDep | None = None):
+    if session is None:
+        # Callers on the async path have no sync session to hand over
+        with Session(engine) as session:
+            return process_reservation(pnr_id, payment_info, session)
     process_payment(payment_info)
     rsv = session.get(PassengerNameRecord, pnr_id)
     if not rsv:
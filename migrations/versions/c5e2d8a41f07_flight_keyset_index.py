@@ -0,0 +1,29 @@
+"""Flight keyset index
+
+Revision ID: c5e2d8a41f07
+Revises: 0a30746e80b3
+Create Date: 2026-10-17 09:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e2d8a41f07'
+down_revision: Union[str, Sequence[str], None] = '0a30746e80b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_flight_date_time_id', 'flight', ['date_time', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_flight_date_time_id', table_name='flight')
@@ -0,0 +1,35 @@
+"""Flight search indexes
+
+Revision ID: e81f4b9c03d6
+Revises: c5e2d8a41f07
+Create Date: 2026-10-17 10:04:18.227940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81f4b9c03d6'
+down_revision: Union[str, Sequence[str], None] = 'c5e2d8a41f07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_flight_route_date_time', 'flight', ['departure_port_id', 'destination_port_id', 'date_time'], unique=False
+    )
+    op.create_index(
+        'ix_flight_number_departure_date_time', 'flight', ['flight_number', 'departure_port_id', 'date_time'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_flight_number_departure_date_time', table_name='flight')
+    op.drop_index('ix_flight_route_date_time', table_name='flight')
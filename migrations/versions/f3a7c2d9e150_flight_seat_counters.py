@@ -0,0 +1,45 @@
+"""Flight seat counters
+
+Revision ID: f3a7c2d9e150
+Revises: e81f4b9c03d6
+Create Date: 2026-10-17 14:21:07.418362
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a7c2d9e150'
+down_revision: Union[str, Sequence[str], None] = 'e81f4b9c03d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('flight', sa.Column('seats_total', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('flight', sa.Column('seats_available', sa.Integer(), server_default='0', nullable=False))
+    # Backfill from the existing seats
+    op.execute(
+        """
+        UPDATE flight SET
+            seats_total = counts.total,
+            seats_available = counts.available
+        FROM (
+            SELECT flight_id, count(*) AS total, count(*) FILTER (WHERE status = 'Available') AS available
+            FROM flightseat
+            GROUP BY flight_id
+        ) AS counts
+        WHERE flight.id = counts.flight_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('flight', 'seats_available')
+    op.drop_column('flight', 'seats_total')
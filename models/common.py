@@ -14,8 +14,11 @@ convention = {
 }
 
 def utcnow():
-    """Returns the current time in UTC."""
-    return datetime.now(timezone.utc)
+    """
+    Returns the current time in UTC, without tzinfo: the timestamp columns have no time zone, and asyncpg
+    rejects aware values for them where psycopg2 silently dropped the offset.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 # Apply the convention to your metadata
@@ -4,9 +4,9 @@ from decimal import Decimal
 from enum import StrEnum
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr, field_validator
+from pydantic import BaseModel, EmailStr, field_validator, model_validator
 from pydantic_extra_types import timezone_name as pydantic_tz
-from sqlalchemy import Column, String
+from sqlalchemy import Column, Index, Integer, String
 from sqlmodel import Field, Relationship, SQLModel, UniqueConstraint
 
 from .common import AirlineAdminLink, TimestampMixin
@@ -99,6 +99,7 @@ class FlightCreate(BaseModel):
     departure_port_id: int
     destination_port_id: int
     airfare: Decimal
+    seat_map: str | None = Field(default=None, description="Name of the seat-map template to generate the seats from")
 
     @field_validator("flight_number")
     def validate_flight_number(cls, v: int) -> int:
@@ -138,6 +139,9 @@ class Flight(TimestampMixin, table=True):
     destination_port_id: int | None = Field(foreign_key="airport.id")
     airfare: Decimal | None = Field(decimal_places=2, max_digits=10, default=None)
     status: FlightStatus = Field(default=FlightStatus.PENDING, sa_column=Column(String, nullable=False))
+    # Seat counters, updated in the same transaction as every seat insert and status change
+    seats_total: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    seats_available: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
     # Convenient relationships
     airline: Airline = Relationship(back_populates="flights")
     destination_port: Airport = Relationship(
@@ -149,6 +153,15 @@ class Flight(TimestampMixin, table=True):
     seats: list["FlightSeat"] = Relationship(back_populates="flight")
     reservations: list["PassengerNameRecord"] = Relationship(back_populates="flight")
 
+    __table_args__ = (
+        # Keyset pagination of the flights listing
+        Index("ix_flight_date_time_id", "date_time", "id"),
+        # Route/day search
+        Index("ix_flight_route_date_time", "departure_port_id", "destination_port_id", "date_time"),
+        # Duplicate flight number checks on create and update
+        Index("ix_flight_number_departure_date_time", "flight_number", "departure_port_id", "date_time"),
+    )
+
 
 class FlightRead(BaseModel):
     id: int
@@ -162,6 +175,13 @@ class FlightRead(BaseModel):
     destination_port: Airport | None
     departure_port: Airport | None
     airfare: Decimal | None
+    seats_total: int = 0
+    seats_available: int = 0
+
+
+class FlightPage(BaseModel):
+    items: list[FlightRead]
+    next_cursor: str | None = Field(default=None, description="Pass as `cursor` to fetch the next page")
 
 
 class SeatStatus(StrEnum):
@@ -191,6 +211,30 @@ class FlightSeat(TimestampMixin, table=True):
         return v
 
 
+class SeatMapCabin(BaseModel):
+    name: str
+    first_row: int
+    last_row: int
+    letters: str = Field(description="Seat letters of each row, e.g. `ABCDEF`")
+    exclude: list[str] = Field(default=[], description="Seats or seat ranges left out, e.g. `13A-13F`")
+
+
+class SeatMapTemplate(BaseModel):
+    name: str
+    cabins: list[SeatMapCabin]
+
+
+class SeatMapApply(BaseModel):
+    template: str | None = Field(default=None, description="Name of a predefined seat-map template")
+    cabins: list[SeatMapCabin] | None = Field(default=None, description="Ad hoc layout, instead of a template")
+
+    @model_validator(mode="after")
+    def check_one_layout(self):
+        if (self.template is None) == (self.cabins is None):
+            raise ValueError("Provide either a template name or cabins")
+        return self
+
+
 class SmallFlight(BaseModel):
     id: int
     flight_number: str
@@ -203,6 +247,30 @@ class SeatRead(BaseModel):
     flight: SmallFlight
 
 
+class SeatAvailability(BaseModel):
+    flight_id: int
+    seats_total: int
+    seats_available: int
+    seats_held: int = Field(default=0, description="Unbooked seats held by a checkout in progress")
+    available_seats: list[str]
+
+
+class SeatBatchReservation(BaseModel):
+    reserved: list[SeatRead]
+    unavailable: list[int] = Field(description="Requested seat ids that are booked or not seats of the flight")
+
+
+class SeatHoldCreate(BaseModel):
+    seat_numbers: list[str] = Field(min_length=1)
+
+
+class SeatHoldRead(BaseModel):
+    hold_id: str
+    flight_id: int
+    seat_numbers: list[str]
+    expires_at: datetime
+
+
 def validate_seat_number(v: str) -> bool:
     """
     Validates that flight_number is between 1 and 9999.
@@ -270,6 +338,7 @@ class PNRCreate(BaseModel):
     phone_number: str
     seat_number: str
     payment_info: PaymentInfo | None = Field(default=None)
+    hold_id: str | None = Field(default=None, description="Checkout hold covering the seat, if one was taken")
 
 
 class PNRCUpdate(BaseModel):
@@ -6,8 +6,8 @@ from app.config import get_settings
 from celery_app import celery_app
 from common.utils import send_email
 from db import engine
-from models.flights import (FlightSeat, PassengerNameRecord, ReservationStatus,
-                            SeatStatus)
+from flights.utils import cancel_reservation_seat
+from models.flights import PassengerNameRecord, ReservationStatus
 
 
 @celery_app.task(name='tasks.send_payment_reminders')
@@ -58,15 +58,10 @@ def cancel_unpaid_reservations():
             flight = record.flight
             if datetime.now()  + timedelta(minutes=30) < record.flight.date_time:
                 pass
-            record.status = ReservationStatus.CANCELLED
-            session.add(record)
-            seat = session.exec(select(FlightSeat).where(
-                FlightSeat.flight_id == flight.id,
-                FlightSeat.seat_number == record.seat_number
-            )).first()
-            if seat:
-                seat.status = SeatStatus.AVAILABLE
-                session.add(seat)
+            if not cancel_reservation_seat(session, record):
+                # Cancelled or paid since it was read
+                session.rollback()
+                continue
             session.commit()
 
             #Send email to the passenger
@@ -3,15 +3,21 @@ import pytest
 from alembic import command
 from alembic.config import Config
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 import db as db_module
 from app.config import get_settings, reset_settings_cache
+from flights.cache import reference_cache
 
 reset_settings_cache()
 settings = get_settings()
 TEST_DATABASE_URL = settings.TEST_DATABASE_URL
 engine = create_engine(TEST_DATABASE_URL)
+# asyncpg connections are bound to the event loop that opened them, and every TestClient runs its own loop
+async_engine = create_async_engine(db_module.to_async_url(TEST_DATABASE_URL), poolclass=NullPool)
 
 # ---------------------------
 # Run Alembic migrations once
@@ -63,11 +69,20 @@ def client(db_session):
         # Reuse the per-test transactional session
         yield db_session
 
+    async def override_get_async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
     # Import the FastAPI app lazily after wiring the test engine
     from app import app as fastapi_app
     fastapi_app.dependency_overrides[db_module.get_session] = override_get_session
+    fastapi_app.dependency_overrides[db_module.get_async_session] = override_get_async_session
+    fastapi_app.dependency_overrides[db_module.get_async_read_session] = override_get_async_session
+    fastapi_app.dependency_overrides[db_module.get_async_primary_session] = override_get_async_session
 
     with TestClient(fastapi_app) as client:
+        # Startup warmed the cache through db.engine; let it reload from the test sessions instead
+        reference_cache.invalidate()
         yield client
 
     fastapi_app.dependency_overrides.clear()
@@ -0,0 +1,122 @@
+import asyncio
+from datetime import date, datetime
+
+from ai.composite import CompositeProvider
+from models.flights import ExternalFlight
+
+
+def flight(number: str) -> ExternalFlight:
+    return ExternalFlight(
+        airline_name="Sample Air",
+        flight_number=number,
+        departure_time=datetime(2030, 1, 1, 9),
+        arrival_time=None,
+        departure_iata="LOS",
+        destination_iata="ABV",
+        airfare=None,
+        booking_url=None,
+    )
+
+
+class FakeProvider:
+    def __init__(self, flights: list[ExternalFlight], delay: float = 0, fail: bool = False):
+        self.flights = flights
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def asearch_external_flights(self, origin_iata, destination_iata, date):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream error")
+        return self.flights
+
+
+def composite(providers, merge=False, hedge_delay=0.05, deadline=0.5, slow_after=0.02, cooldown=60):
+    return CompositeProvider(
+        [(f"P{i}", provider) for i, provider in enumerate(providers)],
+        deadline=deadline,
+        hedge_delay=hedge_delay,
+        merge=merge,
+        failure_threshold=2,
+        cooldown=cooldown,
+        slow_after=slow_after,
+    )
+
+
+def search(provider: CompositeProvider):
+    return asyncio.run(provider.asearch_external_flights("LOS", "ABV", date(2030, 1, 1)))
+
+
+def test_losing_a_race_is_not_held_against_a_provider():
+    slow, fast = FakeProvider([flight("SA1")], delay=10), FakeProvider([flight("DA2")])
+    provider = composite([slow, fast], hedge_delay=0)
+
+    assert [f.flight_number for f in search(provider)] == ["DA2"]
+    # Both started at once and the slow call was dropped well within the slow threshold
+    assert provider.stats()["providers"]["P0"]["cancelled"] == 1
+    assert provider.stats()["providers"]["P0"]["breaker"] == "closed"
+
+
+def test_breaker_skips_a_provider_that_keeps_hanging():
+    hanging, backup = FakeProvider([flight("SA1")], delay=10), FakeProvider([flight("DA2")])
+    provider = composite([hanging, backup])
+
+    for _ in range(3):
+        assert [f.flight_number for f in search(provider)] == ["DA2"]
+    stats = provider.stats()["providers"]["P0"]
+    # Each hung call outlived the hedge delay, so the third search went straight to the backup
+    assert hanging.calls == 2
+    assert stats["slow"] == 2 and stats["skipped"] == 1
+    assert stats["breaker"] == "open"
+    # The dropped calls are in the percentiles, at the time they were dropped
+    assert stats["p50_ms"] >= 40
+
+
+def test_merges_answers_until_the_deadline():
+    hung = FakeProvider([flight("XX9")], delay=10)
+    answers = [FakeProvider([flight("SA1")]), FakeProvider([flight("SA1"), flight("DA2")])]
+    provider = composite([*answers, hung], merge=True, deadline=0.1)
+
+    assert sorted(f.flight_number for f in search(provider)) == ["DA2", "SA1"]
+    assert provider.stats()["providers"]["P2"]["timeouts"] == 1
+    assert provider.stats()["providers"]["P2"]["p99_ms"] >= 90
+
+
+def test_breaker_skips_a_failing_provider():
+    failing, backup = FakeProvider([], fail=True), FakeProvider([flight("DA2")])
+    provider = composite([failing, backup])
+
+    for _ in range(3):
+        assert [f.flight_number for f in search(provider)] == ["DA2"]
+    stats = provider.stats()["providers"]["P0"]
+    assert failing.calls == 2
+    assert stats["failures"] == 2 and stats["skipped"] == 1
+    assert stats["breaker"] == "open"
+    assert provider.stats()["providers"]["P1"]["p50_ms"] is not None
+
+
+def test_answers_finishing_together_are_taken_in_priority_order():
+    first, second = FakeProvider([flight("SA1")]), FakeProvider([flight("DA2")])
+    provider = composite([first, second], hedge_delay=0)
+
+    assert [f.flight_number for f in search(provider)] == ["SA1"]
+    stats = provider.stats()["providers"]["P1"]
+    # Both answered in the same round; the second answer was recorded once, and not dropped as well
+    assert second.calls == 1
+    assert stats["cancelled"] == 0 and stats["slow"] == 0 and stats["timeouts"] == 0
+
+
+def test_backup_is_tried_again_after_its_cooldown():
+    primary, backup = FakeProvider([flight("SA1")]), FakeProvider([flight("DA2")])
+    provider = composite([primary, backup], cooldown=0)
+    for _ in range(2):
+        provider.slots[1].breaker.record_failure()
+
+    # The primary answers, so the backup's trial call is never needed, nor claimed
+    assert [f.flight_number for f in search(provider)] == ["SA1"]
+    primary.fail = True
+    assert [f.flight_number for f in search(provider)] == ["DA2"]
+    assert backup.calls == 1
+    assert provider.stats()["providers"]["P1"]["breaker"] == "closed"
@@ -0,0 +1,39 @@
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import db as db_module
+from app.config import get_settings
+from models.common import utcnow
+from models.flights import Airline
+
+
+async def _insert_and_update_airline():
+    async_engine = create_async_engine(db_module.to_async_url(get_settings().TEST_DATABASE_URL))
+    async with AsyncSession(async_engine) as session:
+        airline = Airline(airline_name="Async Air", email="async@air.test", contact_phone="000222", icao_code="ASY")
+        session.add(airline)
+        await session.commit()
+        await session.refresh(airline)
+        created_at = airline.created_at
+
+        airline.contact_phone = "000333"
+        session.add(airline)
+        await session.commit()
+        await session.refresh(airline)
+        updated_at = airline.updated_at
+
+        await session.delete(airline)
+        await session.commit()
+    await async_engine.dispose()
+    return created_at, updated_at
+
+
+def test_async_session_writes_timestamps():
+    # asyncpg refuses aware datetimes for the timestamp columns, so this fails if utcnow() returns one
+    created_at, updated_at = asyncio.run(_insert_and_update_airline())
+
+    assert abs(created_at - utcnow()) < timedelta(minutes=1)
+    assert updated_at >= created_at
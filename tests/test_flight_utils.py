@@ -0,0 +1,38 @@
+import base64
+from datetime import datetime
+
+import pytest
+
+from flights.utils import decode_flight_cursor, encode_flight_cursor
+from models.flights import Flight
+
+
+def _cursor(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def test_cursor_round_trip():
+    flight = Flight(id=42, date_time=datetime(2030, 1, 1, 9, 30))  # type: ignore
+    assert decode_flight_cursor(encode_flight_cursor(flight)) == (datetime(2030, 1, 1, 9, 30), 42)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        _cursor("2030-01-01T09:30:00"),
+        _cursor("yesterday|42"),
+        _cursor("2030-01-01T09:30:00|x"),
+        # Flight times are naive, so an offset can only come from a tampered cursor
+        _cursor("2030-01-01T09:30:00+01:00|42"),
+        _cursor("2030-01-01T09:30:00|99999999999"),
+    ],
+)
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_flight_cursor(cursor)
+
+
+def test_tampered_cursor_returns_400(client):
+    response = client.get("/api/v1/flights/flights/", params={"cursor": _cursor("2030-01-01T09:30:00+01:00|42")})
+    assert response.status_code == 400
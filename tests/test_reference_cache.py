@@ -0,0 +1,40 @@
+import time
+
+from flights.cache import ReferenceDataCache
+from models.flights import Airline, Airport
+
+AIRPORTS = [Airport(id=1, airport_name="Murtala Muhammed", city="Lagos", iata_code="LOS", time_zone="Africa/Lagos")]
+AIRLINES = [Airline(id=2, airline_name="Sample Air", email="ops@sample.test", contact_phone="000111", icao_code="SMP")]
+
+
+def test_lookups_read_the_installed_snapshot():
+    cache = ReferenceDataCache(ttl=60)
+    assert not cache.is_fresh and cache.airport_by_iata("LOS") is None
+
+    cache._install(cache._generation, AIRPORTS, AIRLINES)
+    assert cache.is_fresh
+    assert cache.airport(1).full_name == "Murtala Muhammed-LOS"
+    assert cache.airport_by_iata("LOS").id == 1
+    assert cache.airline(2).airline_name == "Sample Air"
+    assert cache.airline_by_icao("SMP").id == 2
+    assert cache.airline(3) is None
+
+
+def test_snapshot_goes_stale_after_the_ttl_or_a_write():
+    cache = ReferenceDataCache(ttl=60)
+    cache._install(cache._generation, AIRPORTS, AIRLINES)
+    cache._snapshot.loaded_at = time.monotonic() - 60
+    assert not cache.is_fresh
+
+    cache._install(cache._generation, AIRPORTS, AIRLINES)
+    cache.invalidate()
+    assert not cache.is_fresh and cache.airline(2) is None
+
+
+def test_load_racing_with_a_write_is_not_installed():
+    cache = ReferenceDataCache(ttl=60)
+    generation = cache._generation
+    # An airline was written while the tables were being read
+    cache.invalidate()
+    cache._install(generation, AIRPORTS, AIRLINES)
+    assert cache.airline(2) is None
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from datetime import date
+
+from flights import ai_service
+from flights.search_cache import MemorySearchCache, MemorySearchLocks, search_cache
+
+
+def test_cache_expires_and_evicts_entries():
+    async def scenario():
+        cache = MemorySearchCache(ttl=60, max_entries=2)
+        await cache.set("LOS-ABV-2030-01-01", [{"flight_number": "SA1"}])
+        await cache.set("LOS-KAN-2030-01-01", [])
+        assert await cache.get("LOS-ABV-2030-01-01") == [{"flight_number": "SA1"}]
+        # LOS-KAN is now the least recently used
+        await cache.set("ABV-LOS-2030-01-01", [])
+        assert await cache.get("LOS-KAN-2030-01-01") is None
+
+        _, results = cache._entries["LOS-ABV-2030-01-01"]
+        cache._entries["LOS-ABV-2030-01-01"] = (time.monotonic(), results)
+        assert await cache.peek("LOS-ABV-2030-01-01") is None
+        return cache.stats.as_dict()
+
+    assert asyncio.run(scenario()) == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_lock_is_held_until_released_or_expired():
+    async def scenario():
+        locks = MemorySearchLocks(ttl=60)
+        token = await locks.acquire("LOS-ABV-2030-01-01")
+        assert token is not None
+        assert await locks.acquire("LOS-ABV-2030-01-01") is None
+        # Releasing with another token leaves the lock alone
+        await locks.release("LOS-ABV-2030-01-01", "stale")
+        assert await locks.acquire("LOS-ABV-2030-01-01") is None
+        await locks.release("LOS-ABV-2030-01-01", token)
+        assert await locks.acquire("LOS-ABV-2030-01-01") is not None
+
+        expired = MemorySearchLocks(ttl=0)
+        assert await expired.acquire("LOS-ABV-2030-01-01") is not None
+        assert await expired.acquire("LOS-ABV-2030-01-01") is not None
+
+    asyncio.run(scenario())
+
+
+def test_identical_searches_share_one_provider_call(monkeypatch):
+    calls = 0
+
+    async def search_external_flights(origin_iata, destination_iata, dt):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return [{"flight_number": "SA1"}]
+
+    monkeypatch.setattr(ai_service, "_search_external_flights", search_external_flights)
+    search_key = "SQA-SQB-2030-01-01"
+
+    async def scenario():
+        args = (search_key, "SQA", "SQB", date(2030, 1, 1))
+        callers = [asyncio.create_task(ai_service.notify_external_flights(*args)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        # Every caller waits on the same search
+        assert search_key in ai_service._inflight_searches and not any(caller.done() for caller in callers)
+        await asyncio.gather(*callers)
+        # Answered from the cache
+        await ai_service.notify_external_flights(*args)
+        return await search_cache.peek(search_key)
+
+    assert asyncio.run(scenario()) == [{"flight_number": "SA1"}]
+    assert calls == 1
+    assert search_key not in ai_service._inflight_searches
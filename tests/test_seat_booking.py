@@ -0,0 +1,168 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import db as db_module
+from app.config import get_settings
+from flights.seat_maps import bulk_create_seats, expand_seat_range
+from flights.utils import book_seat, cancel_reservation_seat, seat_counters_stmt
+from models.flights import Airline, Airport, Flight, FlightSeat, PassengerNameRecord, SeatStatus
+
+SEATS = expand_seat_range("1A-10F")
+ATTEMPTS = 300
+# Conservative floor for shared CI runners; a local Postgres 16 sustains about 350 attempts/s
+MIN_ATTEMPTS_PER_SECOND = 100
+
+
+@pytest.fixture
+def seated_flight():
+    """A committed flight with 60 seats; concurrent bookings need data visible to other connections"""
+    engine = create_engine(get_settings().TEST_DATABASE_URL)
+    with Session(engine) as session:
+        airline = Airline(airline_name="Stress Air", email="stress@air.test", contact_phone="000111", icao_code="STR")
+        origin = Airport(airport_name="Stress Origin", city="A", iata_code="SOA", time_zone="Africa/Lagos")  # type: ignore
+        dest = Airport(airport_name="Stress Dest", city="B", iata_code="SDB", time_zone="Africa/Lagos")  # type: ignore
+        session.add_all([airline, origin, dest])
+        session.flush()
+        flight = Flight(
+            airline_id=airline.id,
+            flight_number="STR1",
+            date_time=datetime.now() + timedelta(days=7),
+            departure_port_id=origin.id,
+            destination_port_id=dest.id,
+        )
+        session.add(flight)
+        session.flush()
+        bulk_create_seats(session, flight.id, SEATS)  # type: ignore
+        session.commit()
+        ids = (flight.id, airline.id, origin.id, dest.id)
+    try:
+        yield ids[0]
+    finally:
+        with Session(engine) as session:
+            session.exec(delete(PassengerNameRecord).where(PassengerNameRecord.flight_id == ids[0]))  # type: ignore
+            session.exec(delete(FlightSeat).where(FlightSeat.flight_id == ids[0]))  # type: ignore
+            session.exec(delete(Flight).where(Flight.id == ids[0]))  # type: ignore
+            session.exec(delete(Airport).where(Airport.id.in_(ids[2:])))  # type: ignore
+            session.exec(delete(Airline).where(Airline.id == ids[1]))  # type: ignore
+            session.commit()
+        engine.dispose()
+
+
+async def _book_concurrently(flight_id: int) -> tuple[list[str], float]:
+    async_engine = create_async_engine(
+        db_module.to_async_url(get_settings().TEST_DATABASE_URL), pool_size=20, max_overflow=0
+    )
+
+    async def attempt(seat_number: str) -> str | None:
+        async with AsyncSession(async_engine) as session:
+            booked = await book_seat(session, flight_id, seat_number)
+            if booked:
+                await session.exec(seat_counters_stmt(flight_id, available=-1))  # type: ignore
+            await session.commit()
+            return seat_number if booked else None
+
+    # Every seat is contended by five buyers
+    start = time.perf_counter()
+    results = await asyncio.gather(*(attempt(SEATS[i % len(SEATS)]) for i in range(ATTEMPTS)))
+    elapsed = time.perf_counter() - start
+    await async_engine.dispose()
+    return [seat for seat in results if seat], elapsed
+
+
+async def _book_seat_directly(flight_id: int, seat_number: str):
+    async_engine = create_async_engine(db_module.to_async_url(get_settings().TEST_DATABASE_URL))
+    async with AsyncSession(async_engine) as session:
+        assert await book_seat(session, flight_id, seat_number)
+        await session.exec(seat_counters_stmt(flight_id, available=-1))  # type: ignore
+        await session.commit()
+    await async_engine.dispose()
+
+
+def test_concurrent_bookings_never_double_book(seated_flight, record_testsuite_property):
+    winners, elapsed = asyncio.run(_book_concurrently(seated_flight))
+    attempts_per_second = ATTEMPTS / elapsed
+    # Shows up in the JUnit XML report (--junitxml)
+    record_testsuite_property("booking_attempts_per_second", round(attempts_per_second))
+
+    assert sorted(winners) == sorted(SEATS)
+    engine = create_engine(get_settings().TEST_DATABASE_URL)
+    with Session(engine) as session:
+        statuses = session.exec(select(FlightSeat.status).where(FlightSeat.flight_id == seated_flight)).all()
+        flight = session.get(Flight, seated_flight)
+        counters = (flight.seats_total, flight.seats_available)  # type: ignore
+    engine.dispose()
+    assert statuses.count(SeatStatus.BOOKED) == len(SEATS)
+    assert counters == (len(SEATS), 0)
+    assert attempts_per_second >= MIN_ATTEMPTS_PER_SECOND, f"{attempts_per_second:.0f} booking attempts/s"
+
+
+def test_reservation_seat_is_released_once(seated_flight):
+    asyncio.run(_book_seat_directly(seated_flight, "1A"))
+    engine = create_engine(get_settings().TEST_DATABASE_URL)
+    with Session(engine) as session:
+        rsv = PassengerNameRecord(
+            flight_id=seated_flight,
+            passenger_name="Ada Obi",
+            email="ada@example.com",
+            phone_number="0800",
+            seat_number="1A",
+        )
+        session.add(rsv)
+        session.commit()
+        assert cancel_reservation_seat(session, rsv)
+        session.commit()
+        # A second cancel, e.g. the unpaid reservation task racing the passenger, must not free the seat again
+        assert not cancel_reservation_seat(session, rsv)
+        session.rollback()
+        seat_status = session.exec(
+            select(FlightSeat.status).where(FlightSeat.flight_id == seated_flight, FlightSeat.seat_number == "1A")
+        ).one()
+        flight = session.get(Flight, seated_flight, populate_existing=True)
+        available = flight.seats_available  # type: ignore
+    engine.dispose()
+    assert seat_status == SeatStatus.AVAILABLE
+    assert available == len(SEATS)
+
+
+def test_create_reservation_conflict_returns_409(client, seated_flight):
+    from authentication.utils import get_current_active_user
+
+    client.app.dependency_overrides[get_current_active_user] = lambda: None
+    asyncio.run(_book_seat_directly(seated_flight, "1A"))
+    payload = {
+        "flight_id": seated_flight,
+        "passenger_name": "Ada Obi",
+        "email": "ada@example.com",
+        "phone_number": "0800",
+        "seat_number": "1A",
+    }
+    response = client.post("/api/v1/flights/reservations/", json=payload)
+    assert response.status_code == 409
+
+
+def test_search_reports_names_and_seat_counters(client, seated_flight):
+    departure_date = (datetime.now() + timedelta(days=7)).date()
+    payload = {"origin_iata": "SOA", "destination_iata": "SDB", "date": departure_date.isoformat()}
+    response = client.post("/api/v1/flights/search", json=payload)
+    assert response.status_code == 200
+    [found] = response.json()["internal_flights"]
+    assert found["id"] == seated_flight
+    assert found["airline"] == "Stress Air"
+    assert (found["departure_port"], found["destination_port"]) == ("Stress Origin-SOA", "Stress Dest-SDB")
+    assert (found["seats_total"], found["seats_available"]) == (len(SEATS), len(SEATS))
+
+
+def test_availability_reflects_bookings(client, seated_flight):
+    asyncio.run(_book_seat_directly(seated_flight, "1A"))
+    response = client.get(f"/api/v1/flights/flights/{seated_flight}/availability")
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["seats_total"], data["seats_available"]) == (len(SEATS), len(SEATS) - 1)
+    assert "1A" not in data["available_seats"]
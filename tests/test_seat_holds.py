@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+from flights.seat_holds import MemorySeatHoldStore
+
+
+def test_hold_is_all_or_nothing():
+    store = MemorySeatHoldStore(ttl=60)
+
+    async def scenario():
+        assert await store.acquire("first", 1, ["1A", "1B"]) == []
+        assert await store.acquire("second", 1, ["1B", "1C"]) == ["1B"]
+        # The failed hold claimed nothing
+        assert await store.owners(1, ["1A", "1B", "1C"]) == {"1A": "first", "1B": "first"}
+        assert await store.get("second") is None
+
+        await store.release("first", ["1A"])
+        assert await store.get("first") == (1, ["1B"])
+        assert await store.acquire("second", 1, ["1A", "1C"]) == []
+
+    asyncio.run(scenario())
+
+
+def test_expired_hold_frees_its_seats(monkeypatch):
+    store = MemorySeatHoldStore(ttl=60)
+    now = time.monotonic()
+
+    async def scenario():
+        assert await store.acquire("first", 1, ["1A"]) == []
+        monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+        assert await store.owners(1, ["1A"]) == {}
+        assert await store.get("first") is None
+        assert await store.acquire("second", 1, ["1A"]) == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,70 @@
+import time
+
+from flights.seat_inventory import FlightSeatInventory, SeatInventory
+from models.flights import SeatStatus
+
+
+def inventory(flight_id: int = 1) -> FlightSeatInventory:
+    seats = [(10 + i, number, SeatStatus.AVAILABLE) for i, number in enumerate(["1A", "1B", "1C", "2A"])]
+    seats[1] = (11, "1B", SeatStatus.BOOKED)
+    return FlightSeatInventory(flight_id, "SA100", seats)
+
+
+def test_bitset_tracks_bookings():
+    seats = inventory()
+    assert (seats.total, seats.available) == (4, 3)
+    assert not seats.is_available("1B") and seats.is_available("1A")
+    assert not seats.is_available("9Z") and not seats.has_seat("9Z")
+
+    assert seats.set_status("2A", SeatStatus.BOOKED)
+    assert seats.set_status("1B", SeatStatus.AVAILABLE)
+    assert not seats.set_status("9Z", SeatStatus.BOOKED)
+    assert seats.available == 3
+    assert seats.available_seat_numbers() == ["1A", "1B", "1C"]
+    assert [(seat.id, seat.status) for seat in seats.seat_reads()][-2:] == [
+        (12, SeatStatus.AVAILABLE),
+        (13, SeatStatus.BOOKED),
+    ]
+
+
+def test_entries_expire_after_the_ttl():
+    registry = SeatInventory(ttl=60)
+    registry._install(0, inventory())
+    assert registry.peek(1) is not None
+
+    registry.peek(1).loaded_at = time.monotonic() - 60
+    assert registry.peek(1) is None
+
+
+def test_load_racing_with_a_change_is_not_installed():
+    registry = SeatInventory(ttl=60)
+    generation = registry._generations.get(1, 0)
+    # A booking committed while the inventory was being read
+    registry.set_status(1, ["1A"], SeatStatus.BOOKED)
+    registry._install(generation, inventory())
+    assert registry.peek(1) is None
+
+
+def test_status_changes_apply_to_the_loaded_inventory():
+    registry = SeatInventory(ttl=60)
+    registry._install(0, inventory())
+
+    registry.set_status(1, ["1A", "1C"], SeatStatus.BOOKED)
+    assert registry.peek(1).available_seat_numbers() == ["2A"]
+    # A seat added since the load drops the inventory, so the next read reloads it
+    registry.set_status(1, ["3A"], SeatStatus.BOOKED)
+    assert registry.peek(1) is None
+
+    registry._install(registry._generations[1], inventory())
+    registry.invalidate(1)
+    assert registry.peek(1) is None
+
+
+def test_least_recently_used_flight_is_evicted():
+    registry = SeatInventory(ttl=60, max_flights=2)
+    for flight_id in (1, 2):
+        registry._install(0, inventory(flight_id))
+    registry.peek(1)
+    registry._install(0, inventory(3))
+    assert registry.peek(2) is None
+    assert registry.peek(1) is not None and registry.peek(3) is not None
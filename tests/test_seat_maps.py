@@ -0,0 +1,47 @@
+import pytest
+
+from flights.seat_maps import expand_cabins, expand_seat_range, expand_seat_specs, get_template
+from models.flights import SeatMapCabin
+
+
+def test_expand_seat_range():
+    assert expand_seat_range("12c") == ["12C"]
+    assert expand_seat_range("1A-2C") == ["1A", "1B", "1C", "2A", "2B", "2C"]
+
+
+@pytest.mark.parametrize("spec", ["0A", "1000A", "12H", "A12", "3A-1C", "1C-3A", "1A-"])
+def test_invalid_seat_range_is_rejected(spec):
+    with pytest.raises(ValueError):
+        expand_seat_range(spec)
+
+
+def test_expand_seat_specs_keeps_the_first_occurrence():
+    assert expand_seat_specs(["2A", "1A-1B", "1A"]) == ["2A", "1A", "1B"]
+
+
+def test_expand_cabins_skips_excluded_rows():
+    cabins = [
+        SeatMapCabin(name="Business", first_row=1, last_row=2, letters="ac"),
+        SeatMapCabin(name="Economy", first_row=3, last_row=5, letters="ABC", exclude=["4A-4C"]),
+    ]
+    assert expand_cabins(cabins) == ["1A", "1C", "2A", "2C", "3A", "3B", "3C", "5A", "5B", "5C"]
+
+
+@pytest.mark.parametrize(
+    "cabin",
+    [
+        SeatMapCabin(name="Bad letters", first_row=1, last_row=2, letters="AZ"),
+        SeatMapCabin(name="No letters", first_row=1, last_row=2, letters=""),
+        SeatMapCabin(name="Bad rows", first_row=5, last_row=2, letters="AB"),
+    ],
+)
+def test_invalid_cabin_is_rejected(cabin):
+    with pytest.raises(ValueError):
+        expand_cabins([cabin])
+
+
+def test_templates_expand():
+    # 3 business rows of 4, and 26 economy rows of 6 without row 13
+    assert len(expand_cabins(get_template("A320").cabins)) == 3 * 4 + 26 * 6
+    with pytest.raises(ValueError):
+        get_template("A380")
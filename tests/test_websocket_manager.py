@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+from app.broadcast import InProcessBroadcast
+from app.websocket_manager import ConnectionManager, render, settings
+from models.flights import SeatStatus
+
+
+def test_first_snapshot_starts_from_the_shared_sequence():
+    backend = InProcessBroadcast()
+
+    async def scenario():
+        # Changes published before this worker saw the flight
+        for _ in range(3):
+            await backend.next_sequence(f"{ConnectionManager.SEATS}:7")
+        manager = ConnectionManager(backend)
+
+        async def load_seats():
+            return []
+
+        return await manager.seats_snapshot(7, load_seats)
+
+    assert '"seq":3' in asyncio.run(scenario())
+
+
+class FakeWebSocket:
+    """Records the frames sent to it; with `stuck`, every send hangs like a client that stopped reading"""
+
+    def __init__(self, stuck: bool = False):
+        self.stuck = stuck
+        self.frames: list[dict] = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame: str):
+        if self.stuck:
+            await asyncio.Event().wait()
+        self.frames.append(json.loads(frame))
+
+    async def close(self):
+        self.closed = True
+
+
+def test_seat_changes_within_the_window_are_coalesced():
+    async def scenario():
+        manager = ConnectionManager(InProcessBroadcast())
+        await manager.start()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, 9001)
+
+        await manager.broadcast_seat_changes(9001, {"1A": SeatStatus.BOOKED, "1B": SeatStatus.BOOKED})
+        await manager.broadcast_seat_changes(9001, {"1A": SeatStatus.AVAILABLE})
+        await asyncio.sleep(settings.WS_COALESCE_WINDOW * 3)
+        await manager.broadcast_seat_changes(9001, {"2C": SeatStatus.BOOKED})
+        await asyncio.sleep(settings.WS_COALESCE_WINDOW * 3)
+        await manager.stop()
+        return websocket.frames
+
+    frames = asyncio.run(scenario())
+    assert [(frame["type"], frame["seq"]) for frame in frames] == [("seat_changed", 1), ("seat_changed", 2)]
+    # The latest status of each seat
+    assert frames[0]["data"] == [
+        {"seat_number": "1A", "status": "Available"},
+        {"seat_number": "1B", "status": "Booked"},
+    ]
+    assert frames[1]["data"] == [{"seat_number": "2C", "status": "Booked"}]
+
+
+def test_subscriber_with_a_full_queue_is_evicted():
+    async def scenario():
+        manager = ConnectionManager(InProcessBroadcast())
+        stuck, healthy = FakeWebSocket(stuck=True), FakeWebSocket()
+        await manager.connect(stuck, 9002)
+        await manager.connect(healthy, 9002)
+
+        for seq in range(1, settings.WS_QUEUE_SIZE + 3):
+            await manager._deliver(ConnectionManager.SEATS, 9002, render({"type": "seat_changed", "data": []}), seq)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        return manager, stuck, healthy
+
+    manager, stuck, healthy = asyncio.run(scenario())
+    assert list(manager.active_connections[9002]) == [healthy]
+    assert stuck.closed and not healthy.closed
+    assert len(healthy.frames) == settings.WS_QUEUE_SIZE + 2
+    assert manager.seat_sequences[9002] == settings.WS_QUEUE_SIZE + 2
+
+
+def test_snapshot_is_shared_until_the_next_change():
+    loads = 0
+
+    async def load_seats():
+        nonlocal loads
+        loads += 1
+        return []
+
+    async def scenario():
+        manager = ConnectionManager(InProcessBroadcast())
+        first = await manager.seats_snapshot(9003, load_seats)
+        assert await manager.seats_snapshot(9003, load_seats) is first
+        await manager._deliver(ConnectionManager.SEATS, 9003, render({"type": "seat_changed", "data": []}), 1)
+        return await manager.seats_snapshot(9003, load_seats)
+
+    assert json.loads(asyncio.run(scenario()))["seq"] == 1
+    assert loads == 2